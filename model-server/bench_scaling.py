@@ -0,0 +1,87 @@
+"""Throughput of model-server as worker processes are added.
+
+    uv run bench_scaling.py [max_workers] [seconds]
+
+For 1, 2, 4, ... up to ``max_workers`` (default: all cores) this starts
+``main.py`` with WORKERS=n on PORT (default 8011), keeps 4 * n batch requests
+of 100 post-sized texts in flight for ``seconds`` (default 10) and reports
+texts scored per second and the speedup over one worker.
+"""
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+WORDS = "good bad great terrible love hate amazing awful the a this that is was very not".split()
+BATCH = 100
+
+
+def make_texts(count: int) -> list[str]:
+    rng = random.Random(0)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(10, 120))) for _ in range(count)]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, WORKERS=str(workers), PORT=str(port),
+               PROMETHEUS_MULTIPROC_DIR=f"/tmp/model-server-bench-{port}")
+    server = subprocess.Popen([sys.executable, "main.py"], env=env, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=1).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"model-server with {workers} workers did not start")
+
+
+async def drive(url: str, texts: list[str], concurrency: int, seconds: float) -> int:
+    scored = 0
+    deadline = time.monotonic() + seconds
+
+    async def client(offset: int):
+        nonlocal scored
+        async with httpx.AsyncClient(timeout=30) as http:
+            i = offset
+            while time.monotonic() < deadline:
+                batch = texts[i % len(texts):i % len(texts) + BATCH]
+                resp = await http.post(url, json={"texts": batch})
+                resp.raise_for_status()
+                scored += len(batch)
+                i += BATCH
+
+    await asyncio.gather(*(client(n * BATCH) for n in range(concurrency)))
+    return scored
+
+
+if __name__ == "__main__":
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    port = int(os.getenv("PORT", "8011"))
+    texts = make_texts(10_000 + BATCH)
+
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+
+    baseline = None
+    for workers in counts:
+        server = start_server(workers, port)
+        try:
+            url = f"http://127.0.0.1:{port}/batch-inference"
+            asyncio.run(drive(url, texts, 4 * workers, 1.0))          # warm up
+            rate = asyncio.run(drive(url, texts, 4 * workers, seconds)) / seconds
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait()
+        baseline = baseline or rate
+        print(f"{workers:>3} workers: {rate:10.0f} texts/s  ({rate / baseline:4.2f}x)")
@@ -0,0 +1,115 @@
+"""Check the vectorized VADER engine against vaderSentiment and time both.
+
+    uv run bench_vader.py [corpus_file] [tolerance]
+
+Scores a golden corpus with ``SentimentIntensityAnalyzer.polarity_scores``
+and with ``VectorizedSentimentAnalyzer.polarity_scores_many`` and fails if
+any compound score differs by more than ``tolerance`` (default 0.001). The
+corpus is one text per line of ``corpus_file`` (e.g. exported posts and
+comments) or, without one, VADER's own examples plus generated texts that
+exercise boosters, capitals, negations, idioms, "but", emoticons, emojis and
+punctuation. Then reports texts/s of both for a range of batch sizes.
+"""
+import random
+import sys
+import time
+
+from vaderSentiment.vaderSentiment import BOOSTER_DICT, NEGATE, SPECIAL_CASES, SentimentIntensityAnalyzer
+
+from vader_vectorized import VectorizedSentimentAnalyzer
+
+EXAMPLES = [
+    "VADER is smart, handsome, and funny.",
+    "VADER is smart, handsome, and funny!",
+    "VADER is very smart, handsome, and funny.",
+    "VADER is VERY SMART, handsome, and FUNNY.",
+    "VADER is VERY SMART, handsome, and FUNNY!!!",
+    "VADER is VERY SMART, uber handsome, and FRIGGIN FUNNY!!!",
+    "VADER is not smart, handsome, nor funny.",
+    "The book was good.",
+    "At least it isn't a horrible book.",
+    "The book was only kind of good.",
+    "The plot was good, but the characters are uncompelling and the dialog is not great.",
+    "Today SUX!",
+    "Today only kinda sux! But I'll get by, lol",
+    "Make sure you :) or :D today!",
+    "Catch utf-8 emoji such as 💘 and 💋 and 😁",
+    "Not bad at all",
+    "",
+    "   ",
+    "!!!???",
+    "no good no bad no",
+    "least good, at least good, very least good",
+    "never so good, never this bad, without doubt great",
+    "that was the bomb but the shit was a kiss of death",
+]
+
+FILLER = "the a this that it is was i you we they and or of to at in so very least no never without doubt".split()
+EXTRAS = [":)", ":(", ":D", "<3", "(-:", "lol", "😁", "💔", "👍", "isn't", "don't", "wouldn't've", "kind of",
+          "sort of", "just enough", "kinda", "but", "But", "BUT"]
+
+
+def make_corpus(count: int, analyzer: SentimentIntensityAnalyzer) -> list[str]:
+    rng = random.Random(0)
+    lexicon = sorted(analyzer.lexicon)
+    pools = [lexicon, FILLER, sorted(BOOSTER_DICT), NEGATE, sorted(SPECIAL_CASES), EXTRAS]
+    texts = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(1, 40)):
+            word = rng.choice(rng.choices(pools, weights=[30, 30, 10, 6, 2, 6])[0])
+            if rng.random() < 0.1:
+                word = word.upper()
+            if rng.random() < 0.1:
+                word = rng.choice(["", "\"", "(", "*"]) + word + rng.choice([",", ".", "!", "?", "!!", "...", ")"])
+            words.append(word)
+        texts.append(" ".join(words))
+    return texts
+
+
+def verify(corpus: list[str], reference: SentimentIntensityAnalyzer, engine: VectorizedSentimentAnalyzer,
+           tolerance: float) -> bool:
+    expected = [reference.polarity_scores(text) for text in corpus]
+    actual = engine.polarity_scores_many(corpus)
+    worst, labels, failures = dict.fromkeys(("compound", "pos", "neg", "neu"), 0.0), 0, []
+    for i, (text, scores) in enumerate(zip(corpus, expected)):
+        for key in worst:
+            worst[key] = max(worst[key], abs(scores[key] - float(actual[key][i])))
+        labels += (scores["compound"] >= 0) == (actual["compound"][i] >= 0)
+        if abs(scores["compound"] - float(actual["compound"][i])) > tolerance:
+            failures.append((text, scores["compound"], float(actual["compound"][i])))
+    print(f"{len(corpus)} texts: {labels} labels agree, largest difference "
+          + ", ".join(f"{key} {diff:.4f}" for key, diff in worst.items())
+          + f"; {len(failures)} compound scores off by more than {tolerance}")
+    for text, want, got in failures[:10]:
+        print(f"  {want:+.4f} != {got:+.4f}  {text!r}")
+    return not failures
+
+
+def throughput(score, texts: list[str], batch: int, seconds: float = 2.0) -> float:
+    scored, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        offset = scored % (len(texts) - batch + 1)
+        score(texts[offset:offset + batch])
+        scored += batch
+    return scored / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    tolerance = float(sys.argv[2]) if len(sys.argv) > 2 else 0.001
+    reference = SentimentIntensityAnalyzer()
+    engine = VectorizedSentimentAnalyzer(reference)
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            corpus = [line.rstrip("\n") for line in f]
+    else:
+        corpus = EXAMPLES + make_corpus(20_000, reference)
+    ok = verify(corpus, reference, engine, tolerance)
+
+    texts = corpus if len(corpus) >= 1000 else corpus * (1000 // max(1, len(corpus)) + 1)
+    for batch in (1, 10, 100, 1000):
+        loop = throughput(lambda chunk: [reference.polarity_scores(text) for text in chunk], texts, batch)
+        vectorized = throughput(engine.polarity_scores_many, texts, batch)
+        print(f"batch {batch:>5}: reference {loop:9.0f} texts/s, vectorized {vectorized:9.0f} texts/s "
+              f"({vectorized / loop:5.2f}x)")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,42 @@
+"""Export a Hugging Face sentiment model for the model-server transformer backend.
+
+    python export_transformer.py <output_dir> [checkpoint]
+
+Writes ``model.onnx``, an int8 dynamically quantized ``model.int8.onnx``,
+``tokenizer.json`` and ``config.json`` to ``output_dir``; point
+TRANSFORMER_MODEL_PATH at it. ``checkpoint`` defaults to the model the legacy
+``src/sentiment_analysis.py`` pipeline used. Needs torch and transformers
+(the root project's dependencies) plus onnxruntime.
+"""
+import os
+import sys
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+DEFAULT_CHECKPOINT = "distilbert-base-uncased-finetuned-sst-2-english"
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    output_dir = sys.argv[1]
+    checkpoint = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CHECKPOINT
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(checkpoint)
+    model = AutoModelForSequenceClassification.from_pretrained(checkpoint).eval()
+    sample = tokenizer(["an example to trace the graph with", "and another"], padding=True, return_tensors="pt")
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    onnx_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in names), onnx_path,
+                          input_names=names, output_names=["logits"],
+                          dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in names},
+                                        "logits": {0: "batch"}},
+                          opset_version=17)
+    quantize_dynamic(onnx_path, os.path.join(output_dir, "model.int8.onnx"), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)         # tokenizer.json for fast tokenizers
+    model.config.save_pretrained(output_dir)
+    print(f"exported {checkpoint} to {output_dir}")
@@ -1,25 +1,101 @@
+import os
+import gc
 import time
+import signal
+import socket
+import shutil
+import asyncio
 import logging
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from typing import List
 
-from fastapi import FastAPI
-from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from prometheus_client import generate_latest, Counter, Histogram
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import uvicorn
 
+from vader_vectorized import VectorizedSentimentAnalyzer
+
+# server processes; with more than one, metrics go through prometheus multiprocess mode, which
+# must be configured before prometheus_client is imported
+WORKERS = int(os.getenv("WORKERS", "1"))
+PORT = int(os.getenv("PORT", "8001"))
+if __name__ == "__main__" and (WORKERS > 1 or "PROMETHEUS_MULTIPROC_DIR" in os.environ):
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/model-server-metrics")
+    # stale files from a previous run would be summed in
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+# must follow the PROMETHEUS_MULTIPROC_DIR setup above: prometheus_client reads it at import time
+from prometheus_client import generate_latest, multiprocess, CollectorRegistry, Counter, Gauge, Histogram  # noqa: E402
+
 PREDICTION_REQUESTS = Counter("prediction_requests_total", "Total number of prediction requests")
 PREDICTION_ERRORS = Counter("prediction_errors_total", "Total number of failed prediction requests")
 PREDICTION_LATENCY = Histogram("prediction_latency_seconds", "Prediction latency in seconds")
+BATCH_REQUESTS = Counter("batch_prediction_requests_total", "Total number of batch prediction requests")
+BATCH_SIZE = Histogram("batch_prediction_size", "Texts per batch prediction request",
+                       buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500))
+BATCH_LATENCY = Histogram("batch_prediction_latency_seconds", "Batch prediction latency in seconds")
+ITEM_LATENCY = Histogram("batch_prediction_item_latency_seconds", "Scoring latency of one text in a batch",
+                         buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01))
+
+SCORING_POOL_UTILIZATION = Gauge("scoring_pool_utilization", "Fraction of scoring pool workers busy",
+                                 multiprocess_mode="liveall")
+SCORING_QUEUE_DEPTH = Gauge("scoring_queue_depth", "Scoring jobs waiting for a pool worker",
+                            multiprocess_mode="livesum")
+SCORING_QUEUE_WAIT = Histogram("scoring_queue_wait_seconds", "Time a scoring job waited for a pool worker")
+SCORING_REJECTED = Counter("scoring_rejected_total", "Requests rejected because the scoring pool was saturated")
+
+BACKEND_LATENCY = Histogram("model_backend_latency_seconds", "Scoring latency of a request per model backend",
+                            ["backend"])
+MODEL_BATCH_SIZE = Histogram("model_batch_size", "Texts per model call", ["backend"],
+                             buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1000))
+MODEL_BATCH_FILL = Histogram("model_batch_fill_ratio", "Texts per micro-batch as a fraction of its maximum size",
+                             ["backend"], buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0))
+MODEL_BATCH_LATENCY = Histogram("model_batch_latency_seconds", "Duration of one micro-batched model call",
+                                ["backend"])
+MICROBATCH_WAIT = Histogram("microbatch_wait_seconds", "Time a request waited for its micro-batch to start",
+                            ["backend"], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+
+# inline: score on the event loop; thread / process: offload to a bounded pool of SCORING_WORKERS
+SCORING_MODE = os.getenv("SCORING_MODE", "inline")
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(os.cpu_count() or 1)))
+# jobs allowed to wait for a worker before requests are turned away with 503
+SCORING_MAX_QUEUE = int(os.getenv("SCORING_MAX_QUEUE", "64"))
+
+# vader: the reference analyzer, one text at a time; vectorized: batches of at least
+# VECTORIZED_MIN_BATCH texts are scored together as array operations
+SCORING_ENGINE = os.getenv("SCORING_ENGINE", "vader")
+VECTORIZED_MIN_BATCH = int(os.getenv("VECTORIZED_MIN_BATCH", "8"))
+
+# backend used when a request doesn't name one: vader, or transformer if TRANSFORMER_MODEL_PATH is set
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "vader")
+# directory written by export_transformer.py; the transformer backend is only loaded when set
+TRANSFORMER_MODEL_PATH = os.getenv("TRANSFORMER_MODEL_PATH", "")
+TRANSFORMER_MAX_LENGTH = int(os.getenv("TRANSFORMER_MAX_LENGTH", "256"))
+TRANSFORMER_THREADS = int(os.getenv("TRANSFORMER_THREADS", "0"))          # 0: onnxruntime's default
+# concurrent requests are collected for up to MICROBATCH_WAIT_MS into batches of MICROBATCH_MAX_SIZE texts
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_WAIT_MS = float(os.getenv("MICROBATCH_WAIT_MS", "5"))
+# texts allowed to wait for a micro-batch before requests are turned away with 503
+MICROBATCH_MAX_QUEUE = int(os.getenv("MICROBATCH_MAX_QUEUE", "1024"))
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(1024 * 1024)))
 
 logger = logging.getLogger("uvicorn")
 
 ANALYZER: SentimentIntensityAnalyzer | None = None
+VECTORIZED: VectorizedSentimentAnalyzer | None = None
+POOL: "ScoringPool | None" = None
+BATCHERS: dict[str, "MicroBatcher"] = {}
 
 class GetInferenceRequest(BaseModel):
     text: str
+    backend: str | None = None
 
 class LabelScore(BaseModel):
     label: str
@@ -28,28 +104,303 @@ class LabelScore(BaseModel):
 class GetInferenceResponse(BaseModel):
     inference: List[LabelScore]
 
+class BatchItem(BaseModel):
+    id: str | None = None
+    text: str
+
+class BatchInferenceRequest(BaseModel):
+    # plain strings, or {"id": ..., "text": ...} when the caller wants ids echoed back
+    texts: List[str | BatchItem]
+    backend: str | None = None
+
+class BatchResult(BaseModel):
+    id: str | None = None
+    inference: List[LabelScore]
+
+class BatchInferenceResponse(BaseModel):
+    results: List[BatchResult]
+
+def init_analyzer() -> None:
+    global ANALYZER, VECTORIZED
+    if SCORING_ENGINE not in ("vader", "vectorized"):
+        raise ValueError(f"unknown SCORING_ENGINE {SCORING_ENGINE!r}, expected 'vader' or 'vectorized'")
+    if ANALYZER is None:
+        ANALYZER = SentimentIntensityAnalyzer()
+    if SCORING_ENGINE == "vectorized" and VECTORIZED is None:
+        VECTORIZED = VectorizedSentimentAnalyzer(ANALYZER)
+
+def to_inference(compound: float, pos: float, neg: float) -> list[dict]:
+    label = "POSITIVE" if compound >= 0 else "NEGATIVE"
+    return [{"label": label, "score": float(max(pos, neg))}]
+
+def score(text: str) -> list[dict]:
+    assert ANALYZER is not None, "Sentiment analyzer not initialized"
+    scores = ANALYZER.polarity_scores(text)
+    return to_inference(scores["compound"], scores["pos"], scores["neg"])
+
+def score_many(texts: list[str], submitted_at: float) -> tuple[list[list[dict]], float, list[float]]:
+    """Score ``texts``; also returns the time spent waiting for a worker and each text's scoring time."""
+    waited = time.time() - submitted_at
+    if VECTORIZED is not None and len(texts) >= VECTORIZED_MIN_BATCH:
+        start = time.perf_counter()
+        scores = VECTORIZED.polarity_scores_many(texts)
+        # texts are scored together, so each gets an equal share of the batch's time
+        seconds = (time.perf_counter() - start) / len(texts)
+        results = [to_inference(*values) for values in zip(scores["compound"], scores["pos"], scores["neg"])]
+        return results, waited, [seconds] * len(texts)
+    results, item_seconds = [], []
+    for text in texts:
+        start = time.perf_counter()
+        results.append(score(text))
+        item_seconds.append(time.perf_counter() - start)
+    return results, waited, item_seconds
+
+class ScoringPool:
+    """Bounded thread or process pool that keeps CPU-bound scoring off the event loop.
+
+    At most ``workers`` jobs run at once and ``max_queue`` more may wait;
+    beyond that ``run`` rejects the request with 503 instead of queueing
+    without limit. Only touched from the event loop thread.
+    """
+    def __init__(self, mode: str, workers: int, max_queue: int):
+        if mode == "thread":
+            self.executor: Executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scoring")
+        elif mode == "process":
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=init_analyzer)
+        else:
+            raise ValueError(f"unknown SCORING_MODE {mode!r}, expected 'inline', 'thread' or 'process'")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+
+    def _update_gauges(self) -> None:
+        SCORING_POOL_UTILIZATION.set(min(self.pending, self.workers) / self.workers)
+        SCORING_QUEUE_DEPTH.set(max(0, self.pending - self.workers))
+
+    async def run(self, texts: list[str]) -> tuple[list[list[dict]], list[float]]:
+        if self.pending >= self.workers + self.max_queue:
+            SCORING_REJECTED.inc()
+            raise HTTPException(status_code=503, detail="scoring pool saturated", headers={"Retry-After": "1"})
+        self.pending += 1
+        self._update_gauges()
+        try:
+            results, waited, item_seconds = await asyncio.get_running_loop().run_in_executor(
+                self.executor, score_many, texts, time.time())
+        finally:
+            self.pending -= 1
+            self._update_gauges()
+        SCORING_QUEUE_WAIT.observe(waited)
+        return results, item_seconds
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+async def run_scoring(texts: list[str]) -> tuple[list[list[dict]], list[float]]:
+    if POOL is None:
+        results, _, item_seconds = score_many(texts, time.time())
+        return results, item_seconds
+    return await POOL.run(texts)
+
+class MicroBatcher:
+    """Runs concurrent requests for one model as shared, padded batches.
+
+    The first waiting request opens a batch; requests arriving within
+    ``max_wait`` seconds join it until it holds ``max_batch`` texts. The
+    batch then runs on the batcher's own thread while the next one collects,
+    and that one keeps collecting past ``max_wait`` for as long as the model
+    is busy, so under load batches fill without waiting. Requests are never
+    split across batches: one that would overflow the batch waits for the
+    next (which it opens), while smaller requests behind it that still fit go
+    first. Only a request larger than ``max_batch`` is run in chunks. Past ``max_queue`` waiting texts, requests
+    are rejected with 503. Only touched from the event loop thread.
+    """
+    def __init__(self, name: str, infer, max_batch: int, max_wait: float, max_queue: int):
+        self.name = name
+        self.infer = infer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.queued = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-batch")
+        self._running: asyncio.Task | None = None
+        self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def submit(self, texts: list[str]) -> tuple[list[list[dict]], list[float]]:
+        if self.queued + len(texts) > self.max_queue:
+            SCORING_REJECTED.inc()
+            raise HTTPException(status_code=503, detail=f"{self.name} backend saturated",
+                                headers={"Retry-After": "1"})
+        future = asyncio.get_running_loop().create_future()
+        self.queued += len(texts)
+        self._queue.put_nowait((texts, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        waiting: deque[tuple] = deque()               # arrived but not batched yet, oldest first
+        while True:
+            if not waiting:
+                waiting.append(await self._queue.get())
+            batch: list[tuple] = []
+            size = 0
+            deadline = loop.time() + self.max_wait
+            while True:
+                while not self._queue.empty():
+                    waiting.append(self._queue.get_nowait())
+                size = self._fill(batch, size, waiting)
+                if size >= self.max_batch:
+                    break
+                # wait for the next request until the deadline, or past it while the model is busy
+                busy = self._running is not None and not self._running.done()
+                getter = loop.create_task(self._queue.get())
+                await asyncio.wait({getter, self._running} if busy else {getter},
+                                   timeout=None if busy else max(0.0, deadline - loop.time()),
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    if busy:
+                        continue                      # the model is free now: back to the deadline
+                    break
+                waiting.append(getter.result())
+            self.queued -= size
+            if self._running is not None:
+                await self._running                   # one batch on the model thread at a time
+            self._running = loop.create_task(self._run(batch))
+
+    def _fill(self, batch: list[tuple], size: int, waiting: deque) -> int:
+        """Move waiting requests that fit into ``batch``, oldest first; returns its new size.
+
+        The oldest request always opens an empty batch, even one larger than
+        ``max_batch``, so no request waits behind more than the ones ahead of it.
+        """
+        for _ in range(len(waiting)):
+            request = waiting.popleft()
+            if batch and size + len(request[0]) > self.max_batch:
+                waiting.append(request)
+                continue
+            batch.append(request)
+            size += len(request[0])
+        return size
+
+    async def _run(self, batch: list[tuple]) -> None:
+        started = time.perf_counter()
+        for _, _, submitted_at in batch:
+            MICROBATCH_WAIT.labels(self.name).observe(started - submitted_at)
+        texts = [text for request_texts, _, _ in batch for text in request_texts]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self._infer_chunks, texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # texts share their batch's model time equally
+        seconds = (time.perf_counter() - started) / max(1, len(texts))
+        offset = 0
+        for request_texts, future, _ in batch:
+            if not future.done():
+                future.set_result((results[offset:offset + len(request_texts)], [seconds] * len(request_texts)))
+            offset += len(request_texts)
+
+    def _infer_chunks(self, texts: list[str]) -> list[list[dict]]:
+        results = []
+        for start in range(0, len(texts), self.max_batch):
+            chunk = texts[start:start + self.max_batch]
+            with MODEL_BATCH_LATENCY.labels(self.name).time():
+                results.extend(self.infer(chunk))
+            MODEL_BATCH_SIZE.labels(self.name).observe(len(chunk))
+            MODEL_BATCH_FILL.labels(self.name).observe(len(chunk) / self.max_batch)
+        return results
+
+    def shutdown(self) -> None:
+        self._task.cancel()
+        if self._running is not None:
+            self._running.cancel()
+        self._executor.shutdown(cancel_futures=True)
+
+async def run_backend(backend: str | None, texts: list[str]) -> tuple[list[list[dict]], list[float]]:
+    """Score ``texts`` with ``backend`` (default MODEL_BACKEND): vader or a micro-batched model."""
+    name = backend or MODEL_BACKEND
+    if name != "vader" and name not in BATCHERS:
+        raise HTTPException(status_code=400, detail=f"backend {name!r} is not available, expected one of "
+                                                    f"{['vader', *BATCHERS]}")
+    start = time.perf_counter()
+    try:
+        if name == "vader":
+            MODEL_BATCH_SIZE.labels(name).observe(len(texts))
+            return await run_scoring(texts)
+        return await BATCHERS[name].submit(texts)
+    finally:
+        BACKEND_LATENCY.labels(name).observe(time.perf_counter() - start)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global ANALYZER
-    logger.info("Initializing VADER sentiment analyzer")
-    ANALYZER = SentimentIntensityAnalyzer()
+    global POOL
+    logger.info(f"Initializing VADER sentiment analyzer ({SCORING_ENGINE} engine)")
+    init_analyzer()
     logger.info("Analyzer ready")
+    if SCORING_MODE != "inline":
+        POOL = ScoringPool(SCORING_MODE, SCORING_WORKERS, SCORING_MAX_QUEUE)
+        logger.info(f"Scoring on a {SCORING_MODE} pool of {SCORING_WORKERS} workers")
+    if TRANSFORMER_MODEL_PATH:
+        # loaded per worker process: onnxruntime sessions start threads, which don't survive a fork
+        from transformer import TransformerBackend
+        model = TransformerBackend(TRANSFORMER_MODEL_PATH, TRANSFORMER_MAX_LENGTH, TRANSFORMER_THREADS)
+        BATCHERS["transformer"] = MicroBatcher("transformer", model.infer, MICROBATCH_MAX_SIZE,
+                                               MICROBATCH_WAIT_MS / 1000, MICROBATCH_MAX_QUEUE)
+        logger.info(f"Transformer backend ready ({model.model_path})")
+    if MODEL_BACKEND != "vader" and MODEL_BACKEND not in BATCHERS:
+        raise ValueError(f"MODEL_BACKEND {MODEL_BACKEND!r} is not available; the transformer backend "
+                         f"needs TRANSFORMER_MODEL_PATH")
     yield
+    if POOL is not None:
+        POOL.shutdown()
+    for batcher in BATCHERS.values():
+        batcher.shutdown()
 
 app = FastAPI(title="Model Server", description="Simple Sentiment Prediction API", lifespan=lifespan)
 
+class LimitBatchBytes:
+    """Rejects /batch-inference bodies over MAX_BATCH_BYTES before FastAPI reads and parses them.
+
+    A Content-Length over the limit is answered right away; a body without
+    one is counted as it streams in and cut off once it passes the limit.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/batch-inference":
+            return await self.app(scope, receive, send)
+        detail = f"batch payload exceeds {MAX_BATCH_BYTES} bytes"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > MAX_BATCH_BYTES:
+            return await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > MAX_BATCH_BYTES:
+                # raised while FastAPI reads the body, which turns it into the response
+                raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(LimitBatchBytes)
+
 @app.post("/get-inference", response_model=GetInferenceResponse)
 async def get_inference(payload: GetInferenceRequest) -> GetInferenceResponse:
     start_time = time.time()
     PREDICTION_REQUESTS.inc()
 
     try:
-        assert ANALYZER is not None, "Sentiment analyzer not initialized"
-        scores = ANALYZER.polarity_scores(payload.text)
-        label = "POSITIVE" if scores["compound"] >= 0 else "NEGATIVE"
-        score = max(scores["pos"], scores["neg"])
-        prediction = [{"label": label, "score": float(score)}]
-        return GetInferenceResponse(inference=prediction)
+        results, _ = await run_backend(payload.backend, [payload.text])
+        return GetInferenceResponse(inference=results[0])
 
     except Exception:
         PREDICTION_ERRORS.inc()
@@ -58,9 +409,90 @@ async def get_inference(payload: GetInferenceRequest) -> GetInferenceResponse:
         latency = time.time() - start_time
         PREDICTION_LATENCY.observe(latency)
 
+@app.post("/batch-inference", response_model=BatchInferenceResponse, response_model_exclude_none=True)
+async def batch_inference(payload: BatchInferenceRequest) -> BatchInferenceResponse:
+    """Score up to MAX_BATCH_SIZE texts in one request; results are in input order."""
+    if len(payload.texts) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"batch of {len(payload.texts)} exceeds {MAX_BATCH_SIZE} texts")
+    start_time = time.time()
+    BATCH_REQUESTS.inc()
+    BATCH_SIZE.observe(len(payload.texts))
+
+    try:
+        results, item_seconds = await run_backend(
+            payload.backend, [item if isinstance(item, str) else item.text for item in payload.texts])
+        for seconds in item_seconds:
+            ITEM_LATENCY.observe(seconds)
+        return BatchInferenceResponse(results=[
+            BatchResult(inference=result) if isinstance(item, str) else BatchResult(id=item.id, inference=result)
+            for item, result in zip(payload.texts, results)
+        ])
+
+    except Exception:
+        PREDICTION_ERRORS.inc()
+        raise
+    finally:
+        BATCH_LATENCY.observe(time.time() - start_time)
+
 @app.get("/metrics")
 def metrics():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type="text/plain")
     return Response(generate_latest(), media_type="text/plain")
 
+def serve_forked(workers: int, host: str = "0.0.0.0", port: int = 8001) -> None:
+    """Pre-fork ``workers`` uvicorn processes sharing one listening socket.
+
+    The lexicon is loaded here, before forking, and frozen out of the garbage
+    collector so the workers share its pages copy-on-write. A worker that dies
+    is replaced; SIGTERM/SIGINT are passed on to all of them.
+    """
+    config = uvicorn.Config(app, log_level="info")    # also sets up logging for this supervisor
+    init_analyzer()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    def spawn() -> int:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        return pid
+
+    stopping = False
+    children = {spawn() for _ in range(workers)}
+    logger.info(f"Serving on {host}:{port} with {workers} worker processes")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        pid, status = os.wait()
+        children.discard(pid)
+        multiprocess.mark_process_dead(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            children.add(spawn())
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="info")
+    if WORKERS > 1:
+        serve_forked(WORKERS, port=PORT)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=PORT, log_level="info")
@@ -0,0 +1,39 @@
+import asyncio
+import random
+import time
+
+import main
+
+
+def run_requests(sizes: list[int], max_batch: int = 8) -> list[int]:
+    """Submit requests of ``sizes`` texts at once; returns the size of every model call."""
+    calls = []
+
+    def infer(texts):
+        calls.append(len(texts))
+        time.sleep(0.005)
+        return [[{"label": text}] for text in texts]
+
+    async def go():
+        batcher = main.MicroBatcher("test", infer, max_batch, max_wait=0.01, max_queue=10_000)
+        requests = [[f"{i}-{j}" for j in range(size)] for i, size in enumerate(sizes)]
+        try:
+            responses = await asyncio.gather(*(batcher.submit(texts) for texts in requests))
+        finally:
+            batcher.shutdown()
+        for texts, (results, _) in zip(requests, responses):
+            assert [result[0]["label"] for result in results] == texts
+
+    asyncio.run(go())
+    return calls
+
+
+def test_mixed_request_sizes_fill_every_batch_but_the_last():
+    rng = random.Random(0)
+    calls = run_requests([rng.randint(1, 3) for _ in range(300)])
+    assert max(calls) <= 8
+    assert all(size == 8 for size in calls[:-1]), calls
+
+
+def test_only_an_oversized_request_is_chunked():
+    assert run_requests([20]) == [8, 8, 4]
@@ -0,0 +1,50 @@
+import json
+import os
+
+import numpy as np
+
+
+class TransformerBackend:
+    """Sequence-classification transformer run on CPU with ONNX Runtime.
+
+    ``model_dir`` holds what ``export_transformer.py`` writes: ``model.onnx``
+    and/or its int8-quantized ``model.int8.onnx`` (preferred when present),
+    ``tokenizer.json`` and ``config.json`` for the label names. Each call to
+    ``infer`` runs its texts as one batch padded to the longest of them.
+    onnxruntime and tokenizers are optional dependencies
+    (``uv sync --extra transformer``), only imported here.
+    """
+    def __init__(self, model_dir: str, max_length: int = 256, threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        quantized = os.path.join(model_dir, "model.int8.onnx")
+        self.model_path = quantized if os.path.exists(quantized) else os.path.join(model_dir, "model.onnx")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        with open(os.path.join(model_dir, "config.json")) as f:
+            id2label = json.load(f).get("id2label") or {"0": "NEGATIVE", "1": "POSITIVE"}
+        self.labels = [id2label[str(i)].upper() for i in range(len(id2label))]
+
+    def infer(self, texts: list[str]) -> list[list[dict]]:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        logits = self.session.run(None, {name: value for name, value in inputs.items()
+                                         if name in self.input_names})[0]
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+        return [[{"label": self.labels[label], "score": float(row[label])}]
+                for label, row in zip(best, probabilities)]
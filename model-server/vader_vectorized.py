@@ -0,0 +1,273 @@
+import re
+import string
+
+import numpy as np
+from vaderSentiment.vaderSentiment import (BOOSTER_DICT, C_INCR, N_SCALAR, NEGATE, SPECIAL_CASES,
+                                           SentimentIntensityAnalyzer)
+
+STRINGS = np.dtypes.StringDType()
+
+# words the rules look for by name
+_FLAG_WORDS = ("no", "or", "nor", "kind", "of", "least", "at", "very", "never", "so", "this", "without", "doubt",
+               "but")
+
+
+def _ranges(codepoints) -> list[tuple[int, int]]:
+    """Runs of consecutive code points, for a compact regex character class."""
+    ranges = []
+    for codepoint in sorted(codepoints):
+        if ranges and ranges[-1][1] == codepoint - 1:
+            ranges[-1] = (ranges[-1][0], codepoint)
+        else:
+            ranges.append((codepoint, codepoint))
+    return ranges
+
+
+class VectorizedSentimentAnalyzer:
+    """VADER scoring for a whole batch of texts at once.
+
+    Gives the same ``neg``/``neu``/``pos``/``compound`` scores as
+    ``vaderSentiment``'s ``polarity_scores`` (up to float rounding), but
+    instead of walking each text word by word in Python it flattens the
+    batch's tokens into one array, maps them to IDs in a precompiled, sorted
+    vocabulary and applies the lexicon, booster, capitalisation, negation,
+    idiom, "least" and "but" rules as array operations over all tokens. Only
+    emoji replacement and whitespace splitting run per text, plus the
+    reference "but" rule for the rare text where its in-place list quirks
+    would give a different answer. The fixed cost per call only pays off for
+    batches of about ten texts or more.
+    """
+    def __init__(self, reference: SentimentIntensityAnalyzer | None = None):
+        self.reference = reference = reference or SentimentIntensityAnalyzer()
+        lexicon = reference.lexicon
+        # the reference replaces emojis one character at a time, so longer sequences never match
+        self.emojis = {emoji: description for emoji, description in reference.emojis.items() if len(emoji) == 1}
+        self._emoji_re = re.compile("[" + "".join(f"{re.escape(chr(first))}-{re.escape(chr(last))}"
+                                                  for first, last in _ranges(map(ord, self.emojis))) + "]")
+
+        phrases = list(SPECIAL_CASES) + [key for key in BOOSTER_DICT if " " in key]
+        words = set(lexicon) | set(BOOSTER_DICT) | set(NEGATE) | set(_FLAG_WORDS)
+        words |= {word for phrase in phrases for word in phrase.split()}
+        # fixed width: numpy's searchsorted is not reliable on variable-width strings
+        self.vocab = np.array(sorted(words))
+        self._width = self.vocab.itemsize // 4 + 1
+        self.unknown = len(self.vocab)
+        self._base = self.unknown + 1
+        ids = {word: i for i, word in enumerate(self.vocab.tolist())}
+        self._ids = {word: ids[word] for word in _FLAG_WORDS}
+
+        # per-ID features; the extra last slot is the ID of every word outside the vocabulary
+        self.in_lexicon = np.zeros(self._base, dtype=bool)
+        self.valence = np.zeros(self._base)
+        self.is_booster = np.zeros(self._base, dtype=bool)
+        self.booster = np.zeros(self._base)
+        self.is_negation = np.zeros(self._base, dtype=bool)
+        for word, value in lexicon.items():
+            self.in_lexicon[ids[word]] = True
+            self.valence[ids[word]] = value
+        for word, value in BOOSTER_DICT.items():
+            if " " not in word:
+                self.is_booster[ids[word]] = True
+                self.booster[ids[word]] = value
+        for word in NEGATE:
+            self.is_negation[ids[word]] = True
+
+        def table(entries: dict, length: int) -> tuple[np.ndarray, np.ndarray]:
+            """Sorted codes of the ``length``-word phrases in ``entries`` and their values."""
+            codes = {self._code(*(ids[word] for word in phrase.split())): value
+                     for phrase, value in entries.items() if len(phrase.split()) == length}
+            keys = sorted(codes)
+            return np.array(keys, dtype=np.int64), np.array([codes[key] for key in keys])
+
+        multiword_boosters = {phrase: value for phrase, value in BOOSTER_DICT.items() if " " in phrase}
+        self._special_bigrams = table(SPECIAL_CASES, 2)
+        self._special_trigrams = table(SPECIAL_CASES, 3)
+        self._booster_bigrams = table(multiword_boosters, 2)
+        self._booster_trigrams = table(multiword_boosters, 3)
+
+    def _code(self, *ids):
+        code = 0
+        for i in ids:
+            code = code * self._base + np.asarray(i, dtype=np.int64)
+        return int(code) if np.ndim(code) == 0 else code
+
+    @staticmethod
+    def _match(codes: np.ndarray, table: tuple[np.ndarray, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        keys, values = table
+        if not len(keys):
+            return np.zeros(len(codes), dtype=bool), np.zeros(len(codes))
+        at = np.minimum(np.searchsorted(keys, codes), len(keys) - 1)
+        return keys[at] == codes, values[at]
+
+    def _replace_emojis(self, text: str) -> str:
+        if text.isascii() or self.emojis.keys().isdisjoint(text):
+            return text
+
+        def describe(match: re.Match) -> str:
+            start = match.start()
+            space = " " if start > 0 and text[start - 1] != " " else ""
+            return space + self.emojis[match.group()]
+        return self._emoji_re.sub(describe, text)
+
+    def polarity_scores(self, text: str) -> dict[str, float]:
+        # for a single text the array setup costs more than the reference loop
+        return self.reference.polarity_scores(text)
+
+    def polarity_scores_many(self, texts: list[str]) -> dict[str, np.ndarray]:
+        """``neg``, ``neu``, ``pos`` and ``compound`` arrays, one entry per text."""
+        texts = [self._replace_emojis(text) for text in texts]
+        split = [text.split() for text in texts]
+        lengths = np.fromiter((len(words) for words in split), dtype=np.int64, count=len(split))
+        raw = np.array([word for words in split for word in words], dtype=STRINGS)
+
+        # strip surrounding punctuation unless that leaves two characters or fewer (emoticons)
+        stripped = np.strings.strip(raw, string.punctuation)
+        words = np.where(np.strings.str_len(stripped) <= 2, raw, stripped)
+        lower = np.strings.lower(words)
+        upper = np.strings.isupper(words)
+        # a word longer than every vocabulary word stays one character too long to match any
+        keys = np.strings.slice(lower, 0, self._width).astype(f"U{self._width}")
+        at = np.minimum(np.searchsorted(self.vocab, keys), self.unknown - 1)
+        ids = np.where(self.vocab[at] == keys, at, self.unknown)
+        negation = self.is_negation[ids] | (np.strings.find(lower, "n't") >= 0)
+
+        text_of = np.repeat(np.arange(len(texts)), lengths)
+        pos = np.arange(len(ids)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        remaining = lengths[text_of] - pos - 1
+        caps = np.bincount(text_of, weights=upper, minlength=len(texts))
+        cap_differential = ((caps > 0) & (caps < lengths))[text_of]
+
+        def neighbour(values: np.ndarray, offset: int, fill) -> np.ndarray:
+            """``values`` of the token ``offset`` places away in the same text, else ``fill``."""
+            out = np.full_like(values, fill)
+            if len(values) <= abs(offset):
+                return out
+            if offset > 0:
+                out[offset:] = values[:len(values) - offset]
+                out[pos < offset] = fill
+            else:
+                out[:len(values) + offset] = values[-offset:]
+                out[remaining < -offset] = fill
+            return out
+
+        unknown = self.unknown
+        prev = {k: neighbour(ids, k, unknown) for k in (1, 2, 3)}
+        nxt = {k: neighbour(ids, -k, unknown) for k in (1, 2)}
+        prev_upper = {k: neighbour(upper, k, False) for k in (1, 2, 3)}
+        prev_negation = {k: neighbour(negation, k, False) for k in (1, 2, 3)}
+        w = self._ids
+        so_this = {k: (prev[k] == w["so"]) | (prev[k] == w["this"]) for k in (1, 2)}
+
+        lexicon_valence = self.valence[ids]
+        valence = np.where((ids == w["no"]) & self.in_lexicon[nxt[1]], 0.0, lexicon_valence)
+        negated_by_no = (prev[1] == w["no"]) | (prev[2] == w["no"]) | \
+            ((prev[3] == w["no"]) & ((prev[1] == w["or"]) | (prev[1] == w["nor"])))
+        valence = np.where(negated_by_no, lexicon_valence * N_SCALAR, valence)
+        valence = np.where(upper & cap_differential, np.where(valence > 0, valence + C_INCR, valence - C_INCR),
+                           valence)
+
+        for k, damping in ((1, 1.0), (2, 0.95), (3, 0.9)):
+            applies = (pos >= k) & ~self.in_lexicon[prev[k]]
+            booster = self.booster[prev[k]]
+            scalar = np.where(valence < 0, -booster, booster)
+            scalar = np.where(self.is_booster[prev[k]] & prev_upper[k] & cap_differential,
+                              np.where(valence > 0, scalar + C_INCR, scalar - C_INCR), scalar)
+            if damping != 1.0:
+                scalar = np.where(scalar != 0, scalar * damping, scalar)
+            valence = np.where(applies, valence + scalar, valence)
+
+            if k == 1:
+                factor = np.where(prev_negation[1], N_SCALAR, 1.0)
+            elif k == 2:
+                never_so = (prev[2] == w["never"]) & so_this[1]
+                without_doubt = (prev[2] == w["without"]) & (prev[1] == w["doubt"])
+                factor = np.where(never_so, 1.25, np.where(without_doubt | ~prev_negation[2], 1.0, N_SCALAR))
+            else:
+                never_so = ((prev[3] == w["never"]) & so_this[2]) | so_this[1]
+                without_doubt = (prev[3] == w["without"]) & ((prev[2] == w["doubt"]) | (prev[1] == w["doubt"]))
+                factor = np.where(never_so, 1.25, np.where(without_doubt | ~prev_negation[3], 1.0, N_SCALAR))
+            valence = np.where(applies, valence * factor, valence)
+            if k == 3:
+                valence = np.where(applies, self._idioms(valence, ids, prev, nxt), valence)
+
+        after_least = (prev[1] == w["least"]) & ~self.in_lexicon[prev[1]]
+        least = after_least & ((pos == 1) | ((pos > 1) & (prev[2] != w["at"]) & (prev[2] != w["very"])))
+        valence = np.where(least, valence * N_SCALAR, valence)
+
+        skipped = self.is_booster[ids] | ((ids == w["kind"]) & (nxt[1] == w["of"]))
+        sentiments = np.where(self.in_lexicon[ids] & ~skipped, valence, 0.0)
+        sentiments = self._but(sentiments, ids, pos, text_of, lengths, lower)
+        return self._score(sentiments, text_of, lengths, texts)
+
+    def _idioms(self, valence, ids, prev, nxt) -> np.ndarray:
+        code = self._code
+        special = [
+            (self._special_bigrams, code(prev[1], ids)),
+            (self._special_trigrams, code(prev[2], prev[1], ids)),
+            (self._special_bigrams, code(prev[2], prev[1])),
+            (self._special_trigrams, code(prev[3], prev[2], prev[1])),
+            (self._special_bigrams, code(prev[3], prev[2])),
+        ]
+        matched = np.zeros(len(ids), dtype=bool)
+        for table, codes in special:                  # the first matching phrase wins...
+            found, value = self._match(codes, table)
+            valence = np.where(found & ~matched, value, valence)
+            matched |= found
+        for table, codes in ((self._special_bigrams, code(ids, nxt[1])),
+                             (self._special_trigrams, code(ids, nxt[1], nxt[2]))):
+            found, value = self._match(codes, table)     # ...unless one starts at the word itself
+            valence = np.where(found, value, valence)
+        for table, codes in ((self._booster_trigrams, code(prev[3], prev[2], prev[1])),
+                             (self._booster_bigrams, code(prev[3], prev[2])),
+                             (self._booster_bigrams, code(prev[2], prev[1]))):
+            found, value = self._match(codes, table)
+            valence = np.where(found, valence + value, valence)
+        return valence
+
+    def _but(self, sentiments, ids, pos, text_of, lengths, lower) -> np.ndarray:
+        """Halve sentiment before a text's first "but" and boost it by half after."""
+        buts = np.flatnonzero(ids == self._ids["but"])
+        if not len(buts):
+            return sentiments
+        texts, first = np.unique(text_of[buts], return_index=True)
+        but_at = np.full(len(lengths), -1)
+        but_at[texts] = pos[buts[first]]
+        at = but_at[text_of]
+        factor = np.where(at < 0, 1.0, np.where(pos < at, 0.5, np.where(pos > at, 1.5, 1.0)))
+        adjusted = sentiments * factor
+
+        # the reference finds each value with list.index(), so a value equal to an already adjusted
+        # one adjusts that earlier entry instead; replay it exactly for the texts where that can happen
+        starts = np.cumsum(lengths) - lengths
+        for text in texts:
+            span = slice(starts[text], starts[text] + lengths[text])
+            before, after = sentiments[span], adjusted[span]
+            if set(before[before != 0].tolist()) & set(after[after != 0].tolist()):
+                adjusted[span] = SentimentIntensityAnalyzer._but_check(lower[span].tolist(), before.tolist())
+        return adjusted
+
+    @staticmethod
+    def _score(sentiments, text_of, lengths, texts) -> dict[str, np.ndarray]:
+        count = len(texts)
+        total = np.bincount(text_of, weights=sentiments, minlength=count)
+        positive = np.bincount(text_of, weights=np.where(sentiments > 0, sentiments + 1, 0.0), minlength=count)
+        negative = np.bincount(text_of, weights=np.where(sentiments < 0, sentiments - 1, 0.0), minlength=count)
+        neutral = np.bincount(text_of, weights=sentiments == 0, minlength=count)
+
+        marks = np.array(texts, dtype=STRINGS)
+        exclamations = np.minimum(np.strings.count(marks, "!"), 4) * 0.292
+        questions = np.strings.count(marks, "?")
+        emphasis = exclamations + np.where(questions > 1, np.where(questions <= 3, questions * 0.18, 0.96), 0.0)
+
+        total = np.where(total > 0, total + emphasis, np.where(total < 0, total - emphasis, total))
+        compound = np.clip(total / np.sqrt(total * total + 15), -1.0, 1.0)
+        positive, negative = (np.where(positive > -negative, positive + emphasis, positive),
+                              np.where(positive < -negative, negative - emphasis, negative))
+        scored = lengths > 0
+        denominator = np.where(scored, positive - negative + neutral, 1.0)
+        return {
+            "neg": np.round(np.where(scored, np.abs(negative / denominator), 0.0), 3),
+            "neu": np.round(np.where(scored, neutral / denominator, 0.0), 3),
+            "pos": np.round(np.where(scored, np.abs(positive / denominator), 0.0), 3),
+            "compound": np.round(np.where(scored, compound, 0.0), 4),
+        }
@@ -0,0 +1,133 @@
+import pika
+from prometheus_client import Counter, Gauge
+
+AUTOTUNE_PREFETCH = Gauge("consumer_autotune_prefetch", "Prefetch currently set on autotuned channels")
+AUTOTUNE_CONCURRENCY = Gauge("consumer_autotune_concurrency", "Worker concurrency currently allowed")
+AUTOTUNE_ADJUSTMENTS = Counter("consumer_autotune_adjustments_total", "Autotuner changes", ["direction"])
+AUTOTUNE_LAST_ADJUSTMENT = Gauge("consumer_autotune_last_adjustment",
+                                 "Last autotuner step: 1 increase, 0 hold, -1 decrease")
+
+
+def histogram_totals(histogram, **labels) -> tuple[float, float]:
+    """``(sum, count)`` of a labelled prometheus Histogram."""
+    total = count = 0.0
+    for metric in histogram.collect():
+        for sample in metric.samples:
+            if all(sample.labels.get(key) == value for key, value in labels.items()):
+                if sample.name.endswith("_sum"):
+                    total += sample.value
+                elif sample.name.endswith("_count"):
+                    count += sample.value
+    return total, count
+
+
+class Autotuner:
+    """AIMD control of channel prefetch and worker concurrency.
+
+    Every ``interval`` seconds, on the connection thread, it compares the mean
+    processing time per message or batch (decode + inference + write, read from
+    ``stage_histogram``) with ``target_latency`` and the mean inference time
+    with ``target_inference_latency``. Either one over target cuts prefetch and
+    concurrency by ``decrease_factor``; otherwise, if the tuned queues still
+    have a backlog, prefetch grows by ``prefetch_step`` and concurrency by one.
+    Both stay within their bounds and prefetch never drops below concurrency.
+    """
+    def __init__(self, conn: pika.BlockingConnection, stage_histogram, dispatcher=None,
+                 prefetch: int = 5, min_prefetch: int = 1, max_prefetch: int = 1000,
+                 min_concurrency: int = 1, target_latency: float = 1.0,
+                 target_inference_latency: float = 0.5, interval: float = 10.0,
+                 prefetch_step: int = 5, decrease_factor: float = 0.5):
+        self.conn = conn
+        self.stage_histogram = stage_histogram
+        self.dispatcher = dispatcher
+        self.min_prefetch = min_prefetch
+        self.max_prefetch = max_prefetch
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self.target_inference_latency = target_inference_latency
+        self.interval = interval
+        self.prefetch_step = prefetch_step
+        self.decrease_factor = decrease_factor
+
+        self.prefetch = max(min_prefetch, min(max_prefetch, prefetch))
+        self._channels: list[tuple] = []
+        self._last = self._totals()
+        AUTOTUNE_PREFETCH.set(self.prefetch)
+        if dispatcher is not None:
+            AUTOTUNE_CONCURRENCY.set(dispatcher.concurrency)
+
+    def add(self, channel, queue_name: str) -> None:
+        """Tune ``channel``'s prefetch from now on; ``queue_name``'s depth counts as backlog."""
+        self._channels.append((channel, queue_name))
+        channel.basic_qos(prefetch_count=self.prefetch)
+
+    def start(self) -> None:
+        self.conn.call_later(self.interval, self._tick)
+
+    def _tick(self) -> None:
+        try:
+            self.adjust()
+        except Exception as e:
+            print(f"autotune error: {e!r}")
+        self.conn.call_later(self.interval, self._tick)
+
+    def _totals(self) -> dict[str, tuple[float, float]]:
+        return {stage: histogram_totals(self.stage_histogram, stage=stage)
+                for stage in ("decode", "inference", "write")}
+
+    def _backlog(self) -> int:
+        return sum(channel.queue_declare(queue=queue_name, passive=True).method.message_count
+                   for channel, queue_name in self._channels if channel.is_open)
+
+    def adjust(self) -> None:
+        totals = self._totals()
+        delta = {stage: (totals[stage][0] - self._last[stage][0], totals[stage][1] - self._last[stage][1])
+                 for stage in totals}
+        self._last = totals
+        calls = delta["decode"][1]
+        if not calls:
+            AUTOTUNE_LAST_ADJUSTMENT.set(0)
+            return                                    # idle: nothing to learn from
+        latency = sum(seconds for seconds, _ in delta.values()) / calls
+        inference_latency = delta["inference"][0] / delta["inference"][1] if delta["inference"][1] else 0.0
+
+        reasons = []
+        if latency > self.target_latency:
+            reasons.append(f"latency={latency:.3f}s")
+        if inference_latency > self.target_inference_latency:
+            reasons.append(f"inference latency={inference_latency:.3f}s")
+
+        concurrency = self.dispatcher.concurrency if self.dispatcher is not None else 1
+        if reasons:
+            new_concurrency = max(self.min_concurrency, int(concurrency * self.decrease_factor))
+            new_prefetch = max(self.min_prefetch, int(self.prefetch * self.decrease_factor))
+        elif self._backlog() > 0:
+            new_concurrency = concurrency + 1
+            new_prefetch = min(self.max_prefetch, self.prefetch + self.prefetch_step)
+        else:
+            new_concurrency, new_prefetch = concurrency, self.prefetch
+        if self.dispatcher is not None:
+            new_concurrency = min(self.dispatcher.workers, new_concurrency)
+        else:
+            new_concurrency = 1                       # single-threaded: only prefetch is tuned
+        new_prefetch = min(self.max_prefetch, max(new_prefetch, new_concurrency))
+
+        if (new_prefetch, new_concurrency) == (self.prefetch, concurrency):
+            AUTOTUNE_LAST_ADJUSTMENT.set(0)
+            return
+        direction = "decrease" if reasons else "increase"
+        AUTOTUNE_ADJUSTMENTS.labels(direction).inc()
+        AUTOTUNE_LAST_ADJUSTMENT.set(-1 if reasons else 1)
+        print(f"autotune {direction}: prefetch {self.prefetch} -> {new_prefetch}, "
+              f"concurrency {concurrency} -> {new_concurrency} (latency={latency:.3f}s, "
+              f"inference latency={inference_latency:.3f}s)")
+
+        if new_prefetch != self.prefetch:
+            self.prefetch = new_prefetch
+            for channel, _ in self._channels:
+                if channel.is_open:
+                    channel.basic_qos(prefetch_count=new_prefetch)
+            AUTOTUNE_PREFETCH.set(new_prefetch)
+        if self.dispatcher is not None and new_concurrency != concurrency:
+            self.dispatcher.set_concurrency(new_concurrency)
+            AUTOTUNE_CONCURRENCY.set(self.dispatcher.concurrency)
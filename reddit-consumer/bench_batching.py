@@ -0,0 +1,82 @@
+"""Throughput of per-message vs micro-batched post processing.
+
+    uv run bench_batching.py [messages]
+
+Runs the real handlers against the configured INFERENCE_BACKEND (for
+"remote": ML_INFERENCE_URL and, if set, ML_BATCH_INFERENCE_URL) and Mongo (MONGODB_URI, collection "bench_posts",
+dropped afterwards), with a fake channel standing in for RabbitMQ so broker
+time is excluded.
+"""
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+import wire
+from inference import make_backend
+from main import MongoLogger, make_batch_handler, make_callback
+
+WORDS = "good bad great terrible love hate amazing awful the a this that is was very not".split()
+
+
+class FakeChannel:
+    def __init__(self):
+        self.acked = 0
+        self.nacked = 0
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acked += 1
+
+    def basic_nack(self, delivery_tag, requeue=True):
+        self.nacked += 1
+
+
+def make_messages(count: int) -> list[tuple]:
+    rng = random.Random(0)
+    messages = []
+    for i in range(count):
+        post = {
+            "title": " ".join(rng.choices(WORDS, k=8)),
+            "id": f"bench_{i}",
+            "url": f"http://example.com/{i}",
+            "created_utc": time.time(),
+            "selftext": " ".join(rng.choices(WORDS, k=60)),
+            "now_time": time.time(),
+        }
+        method = SimpleNamespace(delivery_tag=i + 1, routing_key="bench")
+        properties = SimpleNamespace(content_type=wire.CONTENT_TYPE_MSGPACK)
+        messages.append((method, properties, wire.encode(post)))
+    return messages
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    backend = make_backend(os.getenv("INFERENCE_BACKEND", "remote"),
+                           os.getenv("ML_INFERENCE_URL"), os.getenv("ML_BATCH_INFERENCE_URL"),
+                           model=os.getenv("INFERENCE_MODEL", "vader"))
+    mongo = MongoLogger(uri=os.getenv("MONGODB_URI", "mongodb://localhost:27017"),
+                        db_name="redditPosts", collection="bench_posts")
+    messages = make_messages(count)
+
+    ch = FakeChannel()
+    callback = make_callback(mongo, backend)
+    start = time.perf_counter()
+    for method, properties, body in messages:
+        callback(ch, method, properties, body)
+    elapsed = time.perf_counter() - start
+    print(f"{'per-message':>14}: {count / elapsed:8.1f} msg/s  (acked {ch.acked}, nacked {ch.nacked})")
+
+    for batch_size in (10, 50, 200):
+        ch = FakeChannel()
+        handler = make_batch_handler(mongo, backend, text_fields=("title", "selftext"))
+        start = time.perf_counter()
+        for i in range(0, count, batch_size):
+            handler(ch, messages[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        print(f"{f'batch of {batch_size}':>14}: {count / elapsed:8.1f} msg/s  (acks {ch.acked}, nacked {ch.nacked})")
+
+    mongo.collection.drop()
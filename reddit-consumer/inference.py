@@ -0,0 +1,339 @@
+"""Inference backends for the consumer.
+
+Both return, for each input text, the model-server response shape:
+``[{"label": "POSITIVE" | "NEGATIVE", "score": float}]``.
+``BreakerBackend`` puts a circuit breaker (and an optional fallback) in front
+of one, and ``CachedInferenceBackend`` wraps either with a content-hash cache.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import requests
+from prometheus_client import Counter, Gauge
+from pymongo import MongoClient, UpdateOne
+
+SESSION = requests.Session()
+
+CACHE_HITS = Counter("consumer_inference_cache_hits_total", "Texts answered without a model call", ["tier"])
+CACHE_MISSES = Counter("consumer_inference_cache_misses_total", "Texts sent to the inference backend")
+CACHE_EVICTIONS = Counter("consumer_inference_cache_evictions_total", "Local cache evictions", ["reason"])
+
+CIRCUIT_STATE = Gauge("consumer_inference_circuit_state", "Inference circuit: 0 closed, 1 half-open, 2 open")
+CIRCUIT_OPENED = Counter("consumer_inference_circuit_opened_total", "Times the inference circuit opened")
+FALLBACK_SCORED = Counter("consumer_inference_fallback_texts_total", "Texts provisionally scored by the fallback")
+
+# what each model returns for an empty or whitespace-only text, where that is known without asking it
+EMPTY_RESULTS = {"vader": [{"label": "POSITIVE", "score": 0.0}]}
+
+
+def get_inference(url: str, text: str, timeout: float = 10,
+                  model: str | None = None) -> dict[str, dict[str, str | int]]:
+    resp = requests.post(url, json={"text": text, "backend": model}, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def get_batch_inference(url: str, texts: list[str], timeout: float = 30,
+                        model: str | None = None) -> list[list[dict[str, str | float]]]:
+    """Score many texts in one request; results come back in input order."""
+    resp = SESSION.post(url, json={"texts": texts, "backend": model}, timeout=timeout)
+    resp.raise_for_status()
+    return [result["inference"] for result in resp.json()["results"]]
+
+
+class RemoteInferenceBackend:
+    """Scores texts via model-server: batch requests if ``batch_url`` is set, else one request per text.
+
+    Batches are split to stay within model-server's MAX_BATCH_SIZE texts and
+    MAX_BATCH_BYTES of JSON per request; a single text over the byte limit
+    still goes on its own and is rejected by the server. Every request names
+    ``model`` (a model-server backend) rather than relying on the server's
+    default, so ``model_id`` says which model produced the results.
+    """
+    def __init__(self, url: str, batch_url: str | None = None, timeout: float = 10,
+                 max_batch_size: int = 1000, max_batch_bytes: int = 1024 * 1024, model: str = "vader"):
+        self.model_id = model
+        self.url = url
+        self.batch_url = batch_url
+        self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+
+    def chunks(self, texts: list[str]) -> list[list[str]]:
+        chunks, chunk, size = [], [], len('{"texts": []}')
+        for text in texts:
+            # requests serializes with json.dumps, ASCII-escaped, so this is the encoded size
+            text_bytes = len(json.dumps(text)) + 2        # ", " separator
+            if chunk and (len(chunk) >= self.max_batch_size or size + text_bytes > self.max_batch_bytes):
+                chunks.append(chunk)
+                chunk, size = [], len('{"texts": []}')
+            chunk.append(text)
+            size += text_bytes
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def infer(self, texts: list[str]) -> list[list[dict[str, str | float]]]:
+        if not texts:
+            return []
+        if self.batch_url:
+            return [result for chunk in self.chunks(texts)
+                    for result in get_batch_inference(self.batch_url, chunk, timeout=3 * self.timeout,
+                                                      model=self.model_id)]
+        return [get_inference(self.url, text, timeout=self.timeout, model=self.model_id)['inference']
+                for text in texts]
+
+
+class LocalInferenceBackend:
+    """Scores texts in-process with VADER, using the same labelling as model-server."""
+    model_id = "vader"
+
+    def __init__(self):
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def infer(self, texts: list[str]) -> list[list[dict[str, str | float]]]:
+        results = []
+        for text in texts:
+            scores = self.analyzer.polarity_scores(text)
+            label = "POSITIVE" if scores["compound"] >= 0 else "NEGATIVE"
+            results.append([{"label": label, "score": float(max(scores["pos"], scores["neg"]))}])
+        return results
+
+
+def make_backend(name: str, url: str | None = None, batch_url: str | None = None, timeout: float = 10,
+                 max_batch_size: int = 1000, max_batch_bytes: int = 1024 * 1024, model: str = "vader"):
+    if name == "remote":
+        return RemoteInferenceBackend(url, batch_url, timeout, max_batch_size, max_batch_bytes, model)
+    if name == "local":
+        if model != "vader":
+            raise ValueError(f"the local inference backend only runs vader, not {model!r}")
+        return LocalInferenceBackend()
+    raise ValueError(f"unknown inference backend {name!r}, expected 'remote' or 'local'")
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency until it has had time to recover.
+
+    ``failure_threshold`` consecutive failed calls, or calls slower than
+    ``latency_threshold`` seconds, open the circuit. After ``reset_timeout``
+    seconds one trial call is let through (half-open): success closes the
+    circuit, failure opens it again.
+    """
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold: int = 5, latency_threshold: float = 2.0, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: int) -> None:
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+            CIRCUIT_OPENED.inc()
+            print(f"inference circuit open after {self.failures} failed or slow calls")
+        elif state == self.CLOSED and self.state != self.CLOSED:
+            print("inference circuit closed")
+        self.state = state
+        CIRCUIT_STATE.set(state)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)   # this caller makes the trial call
+                return True
+            return False
+
+    def record(self, ok: bool, latency: float) -> None:
+        with self._lock:
+            if ok and latency <= self.latency_threshold:
+                self.failures = 0
+                if self.state != self.CLOSED:
+                    self._set_state(self.CLOSED)
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED
+                                                and self.failures >= self.failure_threshold):
+                self._set_state(self.OPEN)
+
+
+class BreakerBackend:
+    """Calls ``primary`` through ``breaker``.
+
+    When the call fails or the circuit is open the texts are scored by
+    ``fallback`` and every result is marked ``provisional``; without a
+    fallback the error propagates so the message is parked for a retry.
+    """
+    def __init__(self, primary, breaker: CircuitBreaker, fallback=None):
+        self.primary = primary
+        self.breaker = breaker
+        self.fallback = fallback
+        self.model_id = primary.model_id                # fallback results are provisional, never cached
+
+    def infer_primary(self, texts: list[str]) -> list[list[dict[str, str | float]]]:
+        if not texts:
+            return []
+        if not self.breaker.allow():
+            raise CircuitOpenError("inference circuit is open")
+        start = time.monotonic()
+        try:
+            results = self.primary.infer(texts)
+        except requests.HTTPError as e:
+            # a 4xx is a bad request, not a sick server: don't let it open the circuit
+            client_error = e.response is not None and 400 <= e.response.status_code < 500
+            self.breaker.record(client_error, time.monotonic() - start)
+            raise
+        except Exception:
+            self.breaker.record(False, time.monotonic() - start)
+            raise
+        self.breaker.record(True, time.monotonic() - start)
+        return results
+
+    def infer(self, texts: list[str]) -> list[list[dict[str, str | float]]]:
+        try:
+            return self.infer_primary(texts)
+        except Exception:
+            if self.fallback is None:
+                raise
+        FALLBACK_SCORED.inc(len(texts))
+        return [[dict(label, provisional=True) for label in result] for result in self.fallback.infer(texts)]
+
+
+def is_provisional(results: list[list[dict]]) -> bool:
+    return any(label.get("provisional") for result in results for label in result)
+
+
+def normalize(text: str | None) -> str:
+    # VADER tokenizes on whitespace and is case sensitive, so only whitespace is normalized
+    return " ".join((text or "").split())
+
+
+def cache_key(model_id: str, text: str) -> str:
+    # per model: after switching models, results of the old one must not be served
+    return hashlib.blake2b(f"{model_id}\0{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU of at most ``max_entries`` values, each expiring ``ttl`` seconds after it was set."""
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                CACHE_EVICTIONS.labels("ttl").inc()
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.labels("size").inc()
+
+
+class MongoInferenceCache:
+    """Inference results shared by all consumer replicas, expired by a Mongo TTL index."""
+    def __init__(self, uri: str, db_name: str = "redditPosts", collection: str = "inference_cache",
+                 ttl: float = 86400):
+        self.collection = MongoClient(uri)[db_name][collection]
+        self.collection.create_index("created", expireAfterSeconds=int(ttl))
+
+    def get_many(self, keys: list[str]) -> dict[str, list[dict]]:
+        return {doc["_id"]: doc["result"] for doc in self.collection.find({"_id": {"$in": keys}})}
+
+    def set_many(self, results: dict[str, list[dict]]) -> None:
+        if results:
+            now = datetime.now(timezone.utc)
+            self.collection.bulk_write([UpdateOne({"_id": key}, {"$set": {"result": result, "created": now}},
+                                                  upsert=True) for key, result in results.items()],
+                                       ordered=False)
+
+
+class CachedInferenceBackend:
+    """Answers repeated texts from a local LRU, then the optional ``shared`` cache, then ``backend``.
+
+    Texts are keyed by ``backend.model_id`` and a hash of their normalized
+    form. Empty texts never reach any of them when the model's result for
+    one is known (``EMPTY_RESULTS``); otherwise they are cached like any
+    other text. A failing shared cache is skipped, never fatal.
+    """
+    def __init__(self, backend, max_entries: int = 100_000, ttl: float = 86400,
+                 shared: MongoInferenceCache | None = None):
+        self.backend = backend
+        self.local = LRUCache(max_entries, ttl)
+        self.shared = shared
+        self.model_id = backend.model_id
+        self.empty_result = EMPTY_RESULTS.get(self.model_id)
+
+    def infer(self, texts: list[str]) -> list[list[dict[str, str | float]]]:
+        results: list = [None] * len(texts)
+        missing: dict[str, list[int]] = {}            # key -> positions; repeats in one call are scored once
+        normalized: dict[str, str] = {}
+        for i, text in enumerate(texts):
+            text = normalize(text)
+            if not text and self.empty_result is not None:
+                results[i] = self.empty_result
+                CACHE_HITS.labels("empty").inc()
+                continue
+            key = cache_key(self.model_id, text)
+            if (cached := self.local.get(key)) is not None:
+                results[i] = cached
+                CACHE_HITS.labels("local").inc()
+            else:
+                missing.setdefault(key, []).append(i)
+                normalized[key] = text
+
+        if missing and self.shared is not None:
+            try:
+                found = self.shared.get_many(list(missing))
+            except Exception as e:
+                print(f"shared inference cache unavailable: {e!r}")
+                found = {}
+            for key, result in found.items():
+                self.local.set(key, result)
+                for i in missing.pop(key):
+                    results[i] = result
+                    CACHE_HITS.labels("shared").inc()
+
+        if missing:
+            keys = list(missing)
+            CACHE_MISSES.inc(sum(len(missing[key]) for key in keys))
+            scored = dict(zip(keys, self.backend.infer([normalized[key] for key in keys])))
+            for key, result in scored.items():
+                for i in missing[key]:
+                    results[i] = result
+            # fallback scores are temporary: don't let them outlive the outage
+            scored = {key: result for key, result in scored.items() if not is_provisional([result])}
+            for key, result in scored.items():
+                self.local.set(key, result)
+            if self.shared is not None and scored:
+                try:
+                    self.shared.set_many(scored)
+                except Exception as e:
+                    print(f"shared inference cache unavailable: {e!r}")
+        return results
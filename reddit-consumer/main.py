@@ -1,50 +1,423 @@
-import os, json, requests, pika
+import os, pika, signal, threading, time
+import wire
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
+from inference import (BreakerBackend, CachedInferenceBackend, CircuitBreaker, LocalInferenceBackend,
+                       MongoInferenceCache, is_provisional, make_backend)
+from autotune import Autotuner
+from rescore import Rescorer
+from scheduling import FairScheduler, QueueSpec, discover_queues, parse_queue_specs
+from retry import RetryPolicy
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne, WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
 
+WORKER_MESSAGES = Counter("consumer_worker_messages_total", "Messages settled per worker", ["worker", "outcome"])
+WORKER_BUSY_SECONDS = Histogram("consumer_worker_busy_seconds",
+                                "Time a worker spent on one message or batch", ["worker"])
+WORKER_IN_FLIGHT = Gauge("consumer_worker_in_flight", "Tasks handed to workers and not yet settled")
 
+STAGE_SECONDS = Histogram("consumer_stage_seconds", "Time spent in each processing stage, per message or batch",
+                          ["stage"])
+MESSAGES_PROCESSED = Counter("consumer_messages_processed_total", "Messages stored and acked", ["queue"])
+MESSAGES_FAILED = Counter("consumer_messages_failed_total", "Messages that failed processing", ["queue"])
+MESSAGES_IN_FLIGHT = Gauge("consumer_messages_in_flight", "Messages delivered and not yet settled", ["queue"])
+INGEST_LAG_SECONDS = Histogram("consumer_ingest_lag_seconds",
+                               "Lag of a stored message: fetch (created_utc to now_time), "
+                               "queue (now_time to stored), total (created_utc to stored)", ["hop"],
+                               buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 21600, 86400))
+
+MONGO_WRITE_SECONDS = Histogram("consumer_mongo_write_seconds", "Latency of one Mongo write call", ["collection"])
+MONGO_WRITE_BATCH_SIZE = Histogram("consumer_mongo_write_batch_size", "Documents per Mongo write call",
+                                   ["collection"], buckets=(1, 5, 10, 25, 50, 100, 200, 500, 1000))
 
-def get_inference(url: str, text: str) -> dict[str, dict[str, str | int]]:
-    resp = requests.post(url, json={"text": text}, timeout=10)
-    resp.raise_for_status()
-    return resp.json()
 
 class MongoLogger:
+    """Idempotent writer: documents are upserted on the Reddit ``id``, so redeliveries and
+    producer replays overwrite instead of duplicating."""
     def __init__(self, uri="mongodb://mongo:27017", db_name="redditPosts", collection="posts"):
         self.client = MongoClient(uri)                # one client for the whole process
-        self.collection = self.client[db_name][collection]
+        # journaled writes: a message is only acked once its document survives a mongod crash
+        self.collection = self.client[db_name].get_collection(
+            collection, write_concern=WriteConcern(w=1, j=True))
+        try:
+            self.collection.create_index("id", unique=True)
+        except OperationFailure as e:
+            print(f"no unique index on {collection}.id (existing duplicates?): {e!r}")
 
     def log(self, doc: dict) -> None:
-        self.collection.insert_one(doc)
+        start = time.perf_counter()
+        try:
+            self.collection.replace_one({"id": doc["id"]}, doc, upsert=True)
+        except DuplicateKeyError:
+            pass                                      # a concurrent upsert of the same id won the race
+        MONGO_WRITE_SECONDS.labels(self.collection.name).observe(time.perf_counter() - start)
+        MONGO_WRITE_BATCH_SIZE.labels(self.collection.name).observe(1)
+
+    def log_many(self, docs: list[dict]) -> set[int]:
+        """Upsert ``docs`` in one unordered bulk write; return the indexes of the ones that failed.
+
+        Raises if the write as a whole failed (e.g. mongod unreachable).
+        """
+        if not docs:
+            return set()
+        start = time.perf_counter()
+        try:
+            self.collection.bulk_write([ReplaceOne({"id": doc["id"]}, doc, upsert=True) for doc in docs],
+                                       ordered=False)
+            failed = set()
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details["writeErrors"] if err["code"] != 11000}
+            if e.details.get("writeConcernErrors"):
+                failed = set(range(len(docs)))
+        MONGO_WRITE_SECONDS.labels(self.collection.name).observe(time.perf_counter() - start)
+        MONGO_WRITE_BATCH_SIZE.labels(self.collection.name).observe(len(docs))
+        return failed
+
+def observe_lag(docs: list[dict]) -> None:
+    """Record ingest lag for documents that were just stored."""
+    now = time.time()
+    for doc in docs:
+        created, fetched = doc.get("created_utc"), doc.get("now_time")
+        if created is not None and fetched is not None:
+            INGEST_LAG_SECONDS.labels("fetch").observe(max(0.0, fetched - created))
+            INGEST_LAG_SECONDS.labels("queue").observe(max(0.0, now - fetched))
+            INGEST_LAG_SECONDS.labels("total").observe(max(0.0, now - created))
+
+def make_scorer(backend):
+    """Decode and score one post, returning the document to store."""
+    def score(method, properties, body: bytes) -> dict:
+        with STAGE_SECONDS.labels("decode").time():
+            data = wire.decode(body, properties.content_type)
+        # Add subreddit from queue name
+        data["subreddit"] = method.routing_key
+        with STAGE_SECONDS.labels("inference").time():
+            results = backend.infer([data.get("title", ""), data.get("selftext", "")])
+        data["title_sentiment"], data["selftext_sentiment"] = results
+        if is_provisional(results):
+            data["provisional"] = True
+        return data
+    return score
 
-def make_callback(mongo: MongoLogger, ml_url: str):
+def make_processor(mongo: MongoLogger, backend):
+    """Decode, score and store one post; raises on failure and never touches the channel."""
+    score = make_scorer(backend)
+    def process(method, properties, body: bytes):
+        doc = score(method, properties, body)
+        with STAGE_SECONDS.labels("write").time():
+            mongo.log(doc)
+        observe_lag([doc])
+    return process
+
+def make_callback(mongo: MongoLogger, backend, retry: RetryPolicy | None = None):
+    process = make_processor(mongo, backend)
     def callback(ch, method, properties, body: bytes):
         try:
-            data = json.loads(body.decode("utf-8"))
-            # Add subreddit from queue name
-            data["subreddit"] = method.routing_key
-            data["title_sentiment"] = get_inference(ml_url, data.get("title", ""))['inference']
-            data["selftext_sentiment"] = get_inference(ml_url, data.get("selftext", ""))['inference']
-
-            mongo.log(data)
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+            process(method, properties, body)
+            settle(ch, [(method, properties, body)], [])
         except Exception as e:
             print(f"processing error: {e!r}")
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            settle(ch, [], [(method, properties, body)], retry=retry)
+    return callback
+
+class MessageBatcher:
+    """Collects deliveries and passes them to ``handler(ch, deliveries)`` in batches.
+
+    A batch is handed over once it holds ``max_size`` messages or ``linger``
+    seconds after its first message arrived, whichever comes first. The
+    handler owns acking. Use one batcher per channel: the handler may ack with
+    ``multiple=True`` (``ConcurrentDispatcher.batch_handler`` never does).
+    """
+    def __init__(self, conn: pika.BlockingConnection, handler, max_size: int = 100, linger: float = 0.2):
+        self.conn = conn
+        self.handler = handler
+        self.max_size = max_size
+        self.linger = linger
+        self._channel = None
+        self._pending: list[tuple] = []
+        self._timer = None
+
+    def __call__(self, ch, method, properties, body: bytes):
+        self._channel = ch
+        self._pending.append((method, properties, body))
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = self.conn.call_later(self.linger, self.flush)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self.conn.remove_timeout(self._timer)
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.handler(self._channel, batch)
+
+class BufferedWriter:
+    """Coalesces per-message writes into bulk upserts, on the connection thread.
+
+    Documents are written once ``max_size`` are buffered or ``linger`` seconds
+    after the first one arrived. Each delivery is acked only after its own
+    document was written; deliveries whose write failed go to ``retry``.
+    """
+    def __init__(self, conn: pika.BlockingConnection, mongo: MongoLogger, max_size: int = 100,
+                 linger: float = 0.05, retry: RetryPolicy | None = None):
+        self.conn = conn
+        self.mongo = mongo
+        self.max_size = max_size
+        self.linger = linger
+        self.retry = retry
+        self._pending: list[tuple] = []
+        self._timer = None
+
+    def add(self, ch, delivery: tuple, doc: dict) -> None:
+        self._pending.append((ch, delivery, doc))
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = self.conn.call_later(self.linger, self.flush)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self.conn.remove_timeout(self._timer)
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            with STAGE_SECONDS.labels("write").time():
+                failed = self.mongo.log_many([doc for _, _, doc in batch])
+        except Exception as e:
+            print(f"write error: {e!r}")
+            failed = set(range(len(batch)))
+        observe_lag([doc for i, (_, _, doc) in enumerate(batch) if i not in failed])
+        # deliveries from several queues share the writer; each channel acks its own
+        for ch in {id(ch): ch for ch, _, _ in batch}.values():
+            settle(ch, [delivery for i, (c, delivery, _) in enumerate(batch) if c is ch and i not in failed],
+                   [delivery for i, (c, delivery, _) in enumerate(batch) if c is ch and i in failed],
+                   retry=self.retry)
+
+def make_buffered_callback(writer: BufferedWriter, backend):
+    """Per-message scoring with writes (and acks) deferred to ``writer``."""
+    score = make_scorer(backend)
+    def callback(ch, method, properties, body: bytes):
+        try:
+            writer.add(ch, (method, properties, body), score(method, properties, body))
+        except Exception as e:
+            print(f"processing error: {e!r}")
+            settle(ch, [], [(method, properties, body)], retry=writer.retry)
     return callback
 
+def settle(ch, acked: list[tuple], failed: list[tuple], multiple: bool = True,
+           retry: RetryPolicy | None = None) -> None:
+    """Ack ``acked`` deliveries; one multi-ack when nothing in the batch failed.
+
+    Deliveries are ``(method, properties, body)`` tuples. ``failed`` ones are
+    handed to ``retry``, or dropped with a nack when there is none. Pass
+    ``multiple=False`` when other deliveries on the channel may still be in
+    flight: a multi-ack would ack them too.
+    """
+    start = time.perf_counter()
+    for method, properties, body in failed:
+        MESSAGES_FAILED.labels(method.routing_key).inc()
+        if retry is not None:
+            retry.schedule(ch, method, properties, body)
+        else:
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+    tags = [method.delivery_tag for method, _, _ in acked]
+    if tags and not failed and multiple:
+        ch.basic_ack(delivery_tag=max(tags), multiple=True)
+    else:
+        for tag in tags:
+            ch.basic_ack(delivery_tag=tag)
+    for method, _, _ in acked:
+        MESSAGES_PROCESSED.labels(method.routing_key).inc()
+    for method, _, _ in acked + failed:
+        MESSAGES_IN_FLIGHT.labels(method.routing_key).dec()
+    STAGE_SECONDS.labels("ack").observe(time.perf_counter() - start)
+
+def make_batch_processor(mongo: MongoLogger, backend, text_fields: tuple[str, ...], queue_suffix: str = ""):
+    """Decode a batch, score every ``text_fields`` value in one inference call, one bulk insert.
+
+    Returns ``process(deliveries) -> (acked, failed)`` deliveries and never
+    touches the channel. Sentiment is stored under ``<field>_sentiment``.
+    Queue names are "<subreddit><queue_suffix>".
+    """
+    def process(deliveries: list[tuple]) -> tuple[list[tuple], list[tuple]]:
+        docs, decoded, failed = [], [], []
+        with STAGE_SECONDS.labels("decode").time():
+            for delivery in deliveries:
+                method, properties, body = delivery
+                try:
+                    data = wire.decode(body, properties.content_type)
+                    data["subreddit"] = method.routing_key.removesuffix(queue_suffix)
+                    docs.append(data)
+                    decoded.append(delivery)
+                except Exception as e:
+                    print(f"decode error: {e!r}")
+                    failed.append(delivery)
+        try:
+            texts = [doc.get(field, "") for doc in docs for field in text_fields]
+            with STAGE_SECONDS.labels("inference").time():
+                inferences = iter(backend.infer(texts))
+            for doc in docs:
+                results = [next(inferences) for _ in text_fields]
+                for field, result in zip(text_fields, results):
+                    doc[f"{field}_sentiment"] = result
+                if is_provisional(results):
+                    doc["provisional"] = True
+            with STAGE_SECONDS.labels("write").time():
+                write_failed = mongo.log_many(docs)
+        except Exception as e:
+            print(f"batch processing error: {e!r}")
+            write_failed = set(range(len(decoded)))
+        observe_lag([doc for i, doc in enumerate(docs) if i not in write_failed])
+        failed += [delivery for i, delivery in enumerate(decoded) if i in write_failed]
+        acked = [delivery for i, delivery in enumerate(decoded) if i not in write_failed]
+        return acked, failed
+    return process
+
+def make_batch_handler(mongo: MongoLogger, backend, text_fields: tuple[str, ...], queue_suffix: str = "",
+                       retry: RetryPolicy | None = None):
+    """MessageBatcher handler that processes each batch inline and settles it."""
+    process = make_batch_processor(mongo, backend, text_fields, queue_suffix)
+    def handle(ch, deliveries: list[tuple]):
+        settle(ch, *process(deliveries), retry=retry)
+    return handle
+
+class ConcurrentDispatcher:
+    """Runs message processing on a pool of ``workers`` threads.
+
+    pika connections are not thread safe, so workers never touch a channel:
+    each result is handed back to the connection thread with
+    ``add_callback_threadsafe`` and settled there by its own delivery tags,
+    which keeps acks correct when messages finish out of order. Failed
+    deliveries go to ``retry`` there too. At most ``concurrency`` (up to
+    ``workers``) tasks run at once; the rest wait on the connection thread.
+    """
+    def __init__(self, conn: pika.BlockingConnection, workers: int, retry: RetryPolicy | None = None):
+        self.conn = conn
+        self.retry = retry
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="worker")
+        self.concurrency = workers
+        # only touched on the connection thread
+        self.in_flight = 0
+        self._running = 0
+        self._waiting: deque[tuple] = deque()
+
+    def set_concurrency(self, concurrency: int) -> None:
+        self.concurrency = max(1, min(self.workers, concurrency))
+        self._release()
+
+    def message_callback(self, process):
+        """on_message_callback that runs ``process(method, properties, body)`` on a worker."""
+        def callback(ch, method, properties, body: bytes):
+            def work():
+                try:
+                    process(method, properties, body)
+                    return [(method, properties, body)], []
+                except Exception as e:
+                    print(f"processing error: {e!r}")
+                    return [], [(method, properties, body)]
+            self._submit(ch, work)
+        return callback
+
+    def batch_handler(self, process):
+        """MessageBatcher handler that runs a ``make_batch_processor`` process on a worker."""
+        def handle(ch, deliveries: list[tuple]):
+            self._submit(ch, partial(process, deliveries))
+        return handle
+
+    def _submit(self, ch, work) -> None:
+        self.in_flight += 1
+        WORKER_IN_FLIGHT.inc()
+        self._waiting.append((ch, work))
+        self._release()
+
+    def _release(self) -> None:
+        while self._waiting and self._running < self.concurrency:
+            self._running += 1
+            self.pool.submit(self._run, *self._waiting.popleft())
+
+    def _run(self, ch, work) -> None:
+        worker = threading.current_thread().name
+        start = time.perf_counter()
+        acked, failed = work()
+        WORKER_BUSY_SECONDS.labels(worker).observe(time.perf_counter() - start)
+        WORKER_MESSAGES.labels(worker, "acked").inc(len(acked))
+        WORKER_MESSAGES.labels(worker, "failed").inc(len(failed))
+        self.conn.add_callback_threadsafe(partial(self._settle, ch, acked, failed))
+
+    def _settle(self, ch, acked: list[tuple], failed: list[tuple]) -> None:
+        self.in_flight -= 1
+        self._running -= 1
+        WORKER_IN_FLIGHT.dec()
+        if ch.is_open:
+            settle(ch, acked, failed, multiple=False, retry=self.retry)
+        else:                                         # the broker redelivers them
+            for method, _, _ in acked + failed:
+                MESSAGES_IN_FLIGHT.labels(method.routing_key).dec()
+        self._release()
+
+    def drain(self) -> None:
+        """Wait for every dispatched task and settle its result, then stop the pool."""
+        while self.in_flight:
+            self.conn.process_data_events(time_limit=0.1)
+        self.pool.shutdown()
+
 class RabbitMQConsumer:
     def __init__(self, username: str, password: str, port: int, host: str):
         creds = pika.PlainCredentials(username=username, password=password)
         params = pika.ConnectionParameters(host=host, port=port, credentials=creds)
         self.conn = pika.BlockingConnection(params)
         self.channel = self.conn.channel()
+        self._consumers: list[tuple] = []
+        self._stopping = False
+
+    def add_consumer(self, queue_name: str, cb, prefetch: int = 5, channel=None,
+                     retry: RetryPolicy | None = None):
+        """Subscribe ``cb`` to ``queue_name``; pass a fresh ``channel`` to keep its acks separate.
+
+        With ``retry``, its retry and dead-letter queues for ``queue_name`` are declared too.
+        """
+        channel = channel or self.channel
+        channel.queue_declare(queue=queue_name, durable=True)
+        if retry is not None:
+            retry.declare(channel, queue_name)
+        channel.basic_qos(prefetch_count=prefetch)
+        def on_message(ch, method, properties, body: bytes):
+            MESSAGES_IN_FLIGHT.labels(method.routing_key).inc()
+            cb(ch, method, properties, body)
+        tag = channel.basic_consume(queue=queue_name, on_message_callback=on_message, auto_ack=False)
+        self._consumers.append((channel, tag))
+        return channel
+
+    def stop(self, *_) -> None:
+        """Make ``start`` drain and return; usable as a signal handler."""
+        self._stopping = True
+
+    def start(self, on_drain=()):
+        """Process deliveries until ``stop`` is called, then shut down gracefully.
+
+        Consumers are cancelled first so nothing new arrives (unprocessed
+        prefetched messages go back to the queue), then each ``on_drain``
+        callable runs in order and the connection is closed.
+        """
+        while not self._stopping:
+            self.conn.process_data_events(time_limit=1)
+        print("draining")
+        for channel, tag in self._consumers:
+            channel.basic_cancel(tag)
+        for drain in on_drain:
+            drain()
+        self.conn.close()
 
     def consume(self, queue_name: str, cb):
-        self.channel.queue_declare(queue=queue_name, durable=True)
-        self.channel.basic_qos(prefetch_count=5)
-        self.channel.basic_consume(queue=queue_name, on_message_callback=cb, auto_ack=False)
-        self.channel.start_consuming()
+        self.add_consumer(queue_name, cb)
+        self.start()
 
 if __name__ == "__main__":
     load_dotenv()
@@ -56,11 +429,171 @@ if __name__ == "__main__":
 
 
     ml_url = os.getenv("ML_INFERENCE_URL")
+    # model-server /batch-inference; without it batches fall back to one request per text
+    ml_batch_url = os.getenv("ML_BATCH_INFERENCE_URL")
+    # remote: model-server over HTTP; local: score with VADER in this process
+    inference_backend = os.getenv("INFERENCE_BACKEND", "remote")
+    backend = make_backend(inference_backend, ml_url, ml_batch_url,
+                           timeout=float(os.getenv("INFERENCE_TIMEOUT_S", "10")),
+                           # keep in line with model-server's MAX_BATCH_SIZE / MAX_BATCH_BYTES
+                           max_batch_size=int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "1000")),
+                           max_batch_bytes=int(os.getenv("INFERENCE_MAX_BATCH_BYTES", str(1024 * 1024))),
+                           # model-server backend to score with (vader | transformer); cached results are per model
+                           model=os.getenv("INFERENCE_MODEL", "vader"))
+    breaker_backend = None
+    if inference_backend == "remote":
+        # slow or failing model-server opens the circuit; INFERENCE_FALLBACK=park retries the messages later,
+        # local scores them with in-process VADER and marks the documents provisional for the re-scorer
+        breaker = CircuitBreaker(failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+                                 latency_threshold=float(os.getenv("BREAKER_LATENCY_THRESHOLD_S", "2")),
+                                 reset_timeout=float(os.getenv("BREAKER_RESET_S", "30")))
+        fallback = LocalInferenceBackend() if os.getenv("INFERENCE_FALLBACK", "park") == "local" else None
+        backend = breaker_backend = BreakerBackend(backend, breaker, fallback)
+    # repeated titles/selftexts are answered from a content-hash cache; INFERENCE_CACHE_SIZE=0 disables it
+    cache_size = int(os.getenv("INFERENCE_CACHE_SIZE", "100000"))
+    if cache_size > 0:
+        cache_ttl = float(os.getenv("INFERENCE_CACHE_TTL_S", "86400"))
+        shared_cache = None
+        if os.getenv("INFERENCE_CACHE_SHARED", "false").strip().lower() in ("1", "true", "yes"):
+            shared_cache = MongoInferenceCache(os.getenv("MONGODB_URI", "mongodb://mongo:27017"), ttl=cache_ttl)
+        backend = CachedInferenceBackend(backend, max_entries=cache_size, ttl=cache_ttl, shared=shared_cache)
 
 
     mongo = MongoLogger(uri=os.getenv("MONGODB_URI", "mongodb://mongo:27017"),
                         db_name="redditPosts",
                         collection="posts")
 
+    start_http_server(int(os.getenv("METRICS_PORT", "8003")))
+
     consumer = RabbitMQConsumer(rabbitmq_user, rabbitmq_password, rabbitmq_port, rabbitmq_host)
-    consumer.consume(rabbitmq_queue_name, make_callback(mongo, ml_url))
+    rescorer = None
+    if breaker_backend is not None and breaker_backend.fallback is not None:
+        rescore_targets = [(mongo.collection, ("title", "selftext"))]
+        if os.getenv("RABBITMQ_COMMENT_QUEUE_NAME") or os.getenv("RABBITMQ_QUEUE_PATTERN"):
+            rescore_targets.append((mongo.client["redditPosts"]["comments"], ("body",)))
+        rescorer = Rescorer(breaker_backend, rescore_targets,
+                            interval=float(os.getenv("RESCORE_INTERVAL_S", "30")))
+        rescorer.start()
+
+    # failed messages wait in <queue>.retry.<n> (RETRY_BASE_DELAY_S * 2**n) and end up in <queue>.dlq
+    retry = RetryPolicy(base_delay=float(os.getenv("RETRY_BASE_DELAY_S", "5")),
+                        max_retries=int(os.getenv("RETRY_MAX", "5")))
+    # WORKERS > 1 processes messages on a thread pool so one slow inference call doesn't stall the queue
+    workers = int(os.getenv("WORKERS", "1"))
+    dispatcher = ConcurrentDispatcher(consumer.conn, workers, retry) if workers > 1 else None
+    batchers = []
+    batch_mode = os.getenv("BATCH_MODE", "false").strip().lower() in ("1", "true", "yes")
+    if batch_mode:
+        text_fields = ("title", "selftext")
+        batch_handler = dispatcher.batch_handler(make_batch_processor(mongo, backend, text_fields)) if dispatcher \
+            else make_batch_handler(mongo, backend, text_fields, retry=retry)
+        default_prefetch = int(os.getenv("PREFETCH", "200"))
+    else:
+        default_prefetch = max(int(os.getenv("PREFETCH", "5")), workers)  # every worker needs a message to work on
+        # WRITE_BATCH_SIZE > 1 coalesces the per-message upserts into bulk writes (single-threaded mode only)
+        write_batch_size = int(os.getenv("WRITE_BATCH_SIZE", "1"))
+        if dispatcher:
+            callback = dispatcher.message_callback(make_processor(mongo, backend))
+        elif write_batch_size > 1:
+            writer = BufferedWriter(consumer.conn, mongo, max_size=write_batch_size,
+                                    linger=int(os.getenv("WRITE_LINGER_MS", "50")) / 1000, retry=retry)
+            batchers.append(writer)
+            callback = make_buffered_callback(writer, backend)
+            default_prefetch = max(default_prefetch, write_batch_size)
+        else:
+            callback = make_callback(mongo, backend, retry)
+
+    # AUTOTUNE=true: AIMD moves the post channels' prefetch within AUTOTUNE_PREFETCH_MIN..MAX and worker
+    # concurrency within AUTOTUNE_WORKERS_MIN..WORKERS to hold AUTOTUNE_TARGET_LATENCY_S per message/batch
+    autotuner = None
+    if os.getenv("AUTOTUNE", "false").strip().lower() in ("1", "true", "yes"):
+        autotuner = Autotuner(consumer.conn, STAGE_SECONDS, dispatcher, prefetch=default_prefetch,
+                              min_prefetch=int(os.getenv("AUTOTUNE_PREFETCH_MIN", "1")),
+                              max_prefetch=int(os.getenv("AUTOTUNE_PREFETCH_MAX", "1000")),
+                              min_concurrency=int(os.getenv("AUTOTUNE_WORKERS_MIN", "1")),
+                              target_latency=float(os.getenv("AUTOTUNE_TARGET_LATENCY_S", "1.0")),
+                              target_inference_latency=float(os.getenv("AUTOTUNE_TARGET_INFERENCE_S", "0.5")),
+                              interval=float(os.getenv("AUTOTUNE_INTERVAL_S", "10")))
+
+    # one consumer reads many post queues, each on its own channel so its prefetch is its own limit;
+    # the fair scheduler gives each backlogged queue turns in proportion to its weight
+    scheduler = FairScheduler(consumer.conn)
+    subscribed: set[str] = set()
+
+    @cache
+    def comment_batch_handler():
+        """Batch handler shared by all comment queues; opens the comments collection on first use."""
+        comment_mongo = MongoLogger(uri=os.getenv("MONGODB_URI", "mongodb://mongo:27017"),
+                                    db_name="redditPosts",
+                                    collection="comments")
+        return dispatcher.batch_handler(make_batch_processor(comment_mongo, backend, ("body",), ".comments")) \
+            if dispatcher else make_batch_handler(comment_mongo, backend, ("body",), ".comments", retry)
+
+    def subscribe(spec: QueueSpec, comments: bool = False) -> None:
+        prefetch = spec.prefetch or default_prefetch
+        if comments:
+            # comments run 10-100x the submission rate: bigger prefetch, bigger batches
+            cb = MessageBatcher(consumer.conn, comment_batch_handler(),
+                                max_size=int(os.getenv("COMMENT_BATCH_SIZE", "200")),
+                                linger=int(os.getenv("COMMENT_BATCH_LINGER_MS", "200")) / 1000)
+            batchers.append(cb)
+            prefetch = spec.prefetch or int(os.getenv("COMMENT_PREFETCH", "1000"))
+        elif batch_mode:                              # a batcher per queue: batches never mix channels
+            cb = MessageBatcher(consumer.conn, batch_handler,
+                                max_size=int(os.getenv("BATCH_SIZE", "50")),
+                                linger=int(os.getenv("BATCH_LINGER_MS", "100")) / 1000)
+            batchers.append(cb)
+        else:
+            cb = callback
+        channel = consumer.add_consumer(spec.name, scheduler.lane(spec.name, cb, spec.weight),
+                                        prefetch=prefetch, channel=consumer.conn.channel(), retry=retry)
+        # an explicit per-queue prefetch, or a comment queue's, is left alone
+        if autotuner is not None and spec.prefetch is None and not comments:
+            autotuner.add(channel, spec.name)
+        subscribed.add(spec.name)
+        print(f"consuming {spec.name} (weight {spec.weight:g}{', comments' if comments else ''})")
+
+    # RABBITMQ_QUEUE_NAME: "name[:weight[:prefetch]],..."
+    queue_specs = {spec.name: spec for spec in parse_queue_specs(rabbitmq_queue_name or "")}
+    for spec in queue_specs.values():
+        subscribe(spec)
+    # RABBITMQ_COMMENT_QUEUE_NAME: the same format, for the producer's <subreddit>.comments queues
+    comment_specs = {spec.name: spec for spec in parse_queue_specs(os.getenv("RABBITMQ_COMMENT_QUEUE_NAME", ""))}
+    for spec in comment_specs.values():
+        subscribe(spec, comments=True)
+
+    # RABBITMQ_QUEUE_PATTERN: also consume every queue whose name matches this regex, re-checked
+    # every QUEUE_REFRESH_S so new subreddits are picked up (uses the management API); matching
+    # *.comments queues are consumed as comment queues
+    queue_pattern = os.getenv("RABBITMQ_QUEUE_PATTERN")
+    if queue_pattern:
+        management_url = os.getenv("RABBITMQ_MANAGEMENT_URL", f"http://{rabbitmq_host}:15672")
+        queue_refresh = float(os.getenv("QUEUE_REFRESH_S", "60"))
+
+        def refresh_queues() -> None:
+            try:
+                names = discover_queues(management_url, rabbitmq_user, rabbitmq_password, queue_pattern)
+            except Exception as e:
+                print(f"queue discovery failed: {e!r}")
+                names = []
+            for name in names:
+                if name in subscribed:
+                    continue
+                if name.endswith(".comments"):
+                    subscribe(comment_specs.get(name, QueueSpec(name)), comments=True)
+                else:
+                    subscribe(queue_specs.get(name, QueueSpec(name)))
+            if queue_refresh > 0:
+                consumer.conn.call_later(queue_refresh, refresh_queues)
+        refresh_queues()
+
+    if autotuner is not None:
+        autotuner.start()
+
+    signal.signal(signal.SIGTERM, consumer.stop)
+    signal.signal(signal.SIGINT, consumer.stop)
+    # dispatch what was already delivered, hand buffered batches over before waiting for the workers to finish them
+    consumer.start(on_drain=[scheduler.drain] + [b.flush for b in batchers]
+                   + ([dispatcher.drain] if dispatcher else []))
+    if rescorer is not None:
+        rescorer.stop()
@@ -0,0 +1,52 @@
+"""Move messages from a dead-letter queue back to the queue they failed on.
+
+    python replay_dlq.py <queue> [limit]
+
+Reads ``<queue>.dlq`` and republishes each message to its original queue with
+a fresh retry budget, acking it from the DLQ only after the broker confirmed
+the republish. Connection settings come from the same RABBITMQ_* variables as
+the consumer.
+"""
+import os
+import sys
+
+import pika
+from dotenv import load_dotenv
+
+from retry import RETRY_HEADER
+
+if __name__ == "__main__":
+    load_dotenv()
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    queue_name = sys.argv[1]
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    creds = pika.PlainCredentials(username=os.getenv("RABBITMQ_USER"), password=os.getenv("RABBITMQ_PASSWORD"))
+    conn = pika.BlockingConnection(pika.ConnectionParameters(host=os.getenv("RABBITMQ_HOST"),
+                                                             port=int(os.getenv("RABBITMQ_PORT")),
+                                                             credentials=creds))
+    channel = conn.channel()
+    channel.confirm_delivery()
+    dlq = f"{queue_name}.dlq"
+    channel.queue_declare(queue=dlq, durable=True)
+
+    replayed = 0
+    while limit is None or replayed < limit:
+        method, properties, body = channel.basic_get(queue=dlq, auto_ack=False)
+        if method is None:
+            break
+        headers = dict(properties.headers or {})
+        target = headers.pop("x-original-queue", queue_name)
+        headers.pop(RETRY_HEADER, None)
+        headers.pop("x-death", None)
+        channel.basic_publish(exchange="", routing_key=target, body=body, mandatory=True,
+                              properties=pika.BasicProperties(content_type=properties.content_type,
+                                                              message_id=properties.message_id,
+                                                              delivery_mode=pika.DeliveryMode.Persistent,
+                                                              headers=headers))
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        replayed += 1
+
+    print(f"replayed {replayed} messages from {dlq}")
+    conn.close()
@@ -0,0 +1,58 @@
+import threading
+
+from prometheus_client import Counter
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+from inference import BreakerBackend, CircuitBreaker
+
+DOCUMENTS_RESCORED = Counter("consumer_documents_rescored_total",
+                             "Provisionally scored documents re-scored by model-server", ["collection"])
+
+
+class Rescorer(threading.Thread):
+    """Background thread that replaces fallback scores once model-server is healthy again.
+
+    Every ``interval`` seconds, while the circuit is closed, documents marked
+    ``provisional`` in each ``(collection, text_fields)`` target are re-scored
+    through ``backend.infer_primary`` in batches of ``batch_size`` and the
+    mark is removed.
+    """
+    def __init__(self, backend: BreakerBackend, targets: list[tuple[Collection, tuple[str, ...]]],
+                 interval: float = 30.0, batch_size: int = 100):
+        super().__init__(name="rescorer", daemon=True)
+        self.backend = backend
+        self.targets = targets
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+        for collection, _ in targets:
+            collection.create_index("provisional", sparse=True)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            for collection, text_fields in self.targets:
+                try:
+                    while self.backend.breaker.state == CircuitBreaker.CLOSED and not self._stopped.is_set() \
+                            and self.rescore_batch(collection, text_fields) == self.batch_size:
+                        pass
+                except Exception as e:
+                    print(f"re-scoring {collection.name} failed: {e!r}")
+
+    def rescore_batch(self, collection: Collection, text_fields: tuple[str, ...]) -> int:
+        docs = list(collection.find({"provisional": True}, {field: 1 for field in text_fields})
+                    .limit(self.batch_size))
+        if not docs:
+            return 0
+        results = iter(self.backend.infer_primary([doc.get(field) or "" for doc in docs for field in text_fields]))
+        collection.bulk_write([
+            UpdateOne({"_id": doc["_id"], "provisional": True},
+                      {"$set": {f"{field}_sentiment": next(results) for field in text_fields},
+                       "$unset": {"provisional": ""}})
+            for doc in docs
+        ], ordered=False)
+        DOCUMENTS_RESCORED.labels(collection.name).inc(len(docs))
+        return len(docs)
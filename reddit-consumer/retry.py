@@ -0,0 +1,72 @@
+import pika
+from prometheus_client import Counter
+
+MESSAGES_RETRIED = Counter("consumer_messages_retried_total", "Failed messages parked for a delayed retry",
+                           ["queue", "attempt"])
+MESSAGES_DEAD_LETTERED = Counter("consumer_messages_dead_lettered_total",
+                                 "Messages moved to the dead-letter queue after their last retry", ["queue"])
+
+RETRY_HEADER = "x-retry-count"
+
+
+class RetryPolicy:
+    """Parks failed messages in delayed retry queues instead of dropping them.
+
+    Attempt ``n`` of a message from ``<queue>`` is republished to
+    ``<queue>.retry.<n>``, whose per-queue TTL is ``base_delay * multiplier**n``.
+    When it expires the broker dead-letters it back to ``<queue>`` through the
+    default exchange, so nothing on the consumer waits for the delay. After
+    ``max_retries`` attempts the message goes to ``<queue>.dlq`` for
+    ``replay_dlq.py``. The original delivery is acked only once the broker
+    confirmed the republish.
+    """
+    def __init__(self, base_delay: float = 5.0, max_retries: int = 5, multiplier: float = 2.0):
+        self.base_delay = base_delay
+        self.max_retries = max_retries
+        self.multiplier = multiplier
+        self._confirming: set[int] = set()
+
+    def delays(self) -> list[float]:
+        return [self.base_delay * self.multiplier ** attempt for attempt in range(self.max_retries)]
+
+    def declare(self, ch, queue_name: str) -> None:
+        """Declare the retry tiers and dead-letter queue for ``queue_name`` on ``ch``."""
+        for attempt, delay in enumerate(self.delays()):
+            ch.queue_declare(queue=f"{queue_name}.retry.{attempt}", durable=True, arguments={
+                "x-message-ttl": int(delay * 1000),
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": queue_name,
+            })
+        ch.queue_declare(queue=f"{queue_name}.dlq", durable=True)
+        if ch.channel_number not in self._confirming:
+            ch.confirm_delivery()
+            self._confirming.add(ch.channel_number)
+
+    def schedule(self, ch, method, properties, body: bytes) -> None:
+        """Move a failed delivery to its next retry tier (or the DLQ) and ack it."""
+        # redelivered retries arrive with the original queue as their routing key
+        queue_name = method.routing_key
+        headers = dict(properties.headers or {})
+        attempt = int(headers.get(RETRY_HEADER, 0))
+        if attempt < self.max_retries:
+            target = f"{queue_name}.retry.{attempt}"
+            headers[RETRY_HEADER] = attempt + 1
+        else:
+            target = f"{queue_name}.dlq"
+            headers["x-original-queue"] = queue_name
+        try:
+            ch.basic_publish(exchange="", routing_key=target, body=body, mandatory=True,
+                             properties=pika.BasicProperties(content_type=properties.content_type,
+                                                             message_id=properties.message_id,
+                                                             delivery_mode=pika.DeliveryMode.Persistent,
+                                                             headers=headers))
+        except Exception as e:
+            # could not park it: let the broker redeliver rather than lose it
+            print(f"retry publish to {target} failed: {e!r}")
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            return
+        if attempt < self.max_retries:
+            MESSAGES_RETRIED.labels(queue_name, str(attempt + 1)).inc()
+        else:
+            MESSAGES_DEAD_LETTERED.labels(queue_name).inc()
+        ch.basic_ack(delivery_tag=method.delivery_tag)
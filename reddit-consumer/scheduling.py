@@ -0,0 +1,115 @@
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from urllib.parse import quote
+
+import pika
+import requests
+from prometheus_client import Counter, Gauge
+
+QUEUE_BUFFERED = Gauge("consumer_queue_buffered", "Deliveries waiting for their turn in the fair scheduler",
+                       ["queue"])
+QUEUE_DISPATCHED = Counter("consumer_queue_dispatched_total", "Deliveries handed to processing", ["queue"])
+
+
+@dataclass
+class QueueSpec:
+    """A queue to consume, its scheduling weight and its prefetch limit (None: the default)."""
+    name: str
+    weight: float = 1.0
+    prefetch: int | None = None
+
+
+@dataclass
+class _Lane:
+    queue: str
+    cb: object
+    weight: float
+    deficit: float = 0.0
+    pending: deque = field(default_factory=deque)
+
+
+def parse_queue_specs(value: str) -> list[QueueSpec]:
+    """Parse ``"name[:weight[:prefetch]],..."``, e.g. ``"python:3:50,datascience"``."""
+    specs = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, *rest = item.strip().split(":")
+        weight = float(rest[0]) if rest and rest[0] else 1.0
+        if weight <= 0:
+            raise ValueError(f"queue {name!r} needs a positive weight, got {weight}")
+        prefetch = int(rest[1]) if len(rest) > 1 and rest[1] else None
+        specs.append(QueueSpec(name, weight, prefetch))
+    return specs
+
+
+def discover_queues(management_url: str, username: str, password: str, pattern: str,
+                    vhost: str = "/") -> list[str]:
+    """Names of queues in ``vhost`` that fully match ``pattern``, from the RabbitMQ management API.
+
+    Retry and dead-letter queues are never returned.
+    """
+    resp = requests.get(f"{management_url.rstrip('/')}/api/queues/{quote(vhost, safe='')}",
+                        params={"columns": "name"}, auth=(username, password), timeout=10)
+    resp.raise_for_status()
+    regex = re.compile(pattern)
+    return sorted(queue["name"] for queue in resp.json()
+                  if regex.fullmatch(queue["name"]) and ".retry." not in queue["name"]
+                  and not queue["name"].endswith(".dlq"))
+
+
+class FairScheduler:
+    """Weighted fair dispatch of deliveries across queues (deficit round robin).
+
+    Each queue's ``on_message`` only buffers the delivery; ``dispatch`` then
+    runs on the connection thread and, per round, hands each backlogged queue
+    ``weight`` deliveries' worth of turns, so a busy subreddit gets its share
+    and no more. Between rounds control goes back to pika so acks and new
+    deliveries keep flowing. The broker's per-channel prefetch bounds how much
+    any one queue can buffer here.
+    """
+    def __init__(self, conn: pika.BlockingConnection):
+        self.conn = conn
+        self._lanes: list[_Lane] = []
+        self._next = 0
+        self._scheduled = False
+
+    def lane(self, queue_name: str, cb, weight: float = 1.0):
+        """Return the on_message callback for ``queue_name``; ``cb`` gets its deliveries in turn."""
+        lane = _Lane(queue_name, cb, weight)
+        self._lanes.append(lane)
+
+        def on_message(ch, method, properties, body: bytes):
+            lane.pending.append((ch, method, properties, body))
+            QUEUE_BUFFERED.labels(queue_name).inc()
+            self._schedule()
+        return on_message
+
+    def _schedule(self) -> None:
+        if not self._scheduled:
+            self._scheduled = True
+            self.conn.call_later(0, self.dispatch)
+
+    def dispatch(self) -> None:
+        """Run one round over all lanes, starting after the lane that went first last time."""
+        self._scheduled = False
+        lanes = self._lanes[self._next:] + self._lanes[:self._next]
+        self._next = (self._next + 1) % max(1, len(self._lanes))
+        for lane in lanes:
+            if not lane.pending:
+                lane.deficit = 0.0                # idle queues don't bank turns
+                continue
+            lane.deficit += lane.weight
+            while lane.pending and lane.deficit >= 1:
+                lane.deficit -= 1
+                QUEUE_BUFFERED.labels(lane.queue).dec()
+                QUEUE_DISPATCHED.labels(lane.queue).inc()
+                lane.cb(*lane.pending.popleft())
+        if any(lane.pending for lane in self._lanes):
+            self._schedule()
+
+    def drain(self) -> None:
+        """Dispatch everything already delivered."""
+        while any(lane.pending for lane in self._lanes):
+            self.dispatch()
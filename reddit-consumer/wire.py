@@ -0,0 +1,72 @@
+"""Wire encoding of RedditPost and RedditComment messages.
+
+Two formats are in use while consumers roll over:
+
+* ``application/json``: ``json.dumps`` of the record dict (the original format).
+* ``application/x-msgpack``: a 4 byte header (magic ``RP`` for posts or
+  ``RC`` for comments, schema version, flags) followed by the field values
+  as a msgpack array in schema order. With ``FLAG_ZSTD`` set the array is
+  zstd compressed; the producer only compresses when given a
+  ``compress_threshold``, since for typical posts zstd costs more CPU than
+  it saves.
+
+The AMQP ``content_type`` says which one a message uses. Keep this file in
+sync with ``reddit-producer/wire.py``.
+"""
+import json
+
+import msgpack
+import zstandard
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_MSGPACK = "application/x-msgpack"
+
+MAGIC_POST = b"RP"
+MAGIC_COMMENT = b"RC"
+FLAG_ZSTD = 0x01
+SCHEMA_VERSION = 1
+SCHEMAS: dict[bytes, dict[int, tuple[str, ...]]] = {
+    MAGIC_POST: {
+        1: ("title", "id", "url", "created_utc", "selftext", "now_time", "subreddit"),
+    },
+    MAGIC_COMMENT: {
+        1: ("body", "id", "link_id", "parent_id", "author", "created_utc", "now_time", "subreddit"),
+    },
+}
+
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def encode(record: dict, content_type: str = CONTENT_TYPE_MSGPACK, compress_threshold: int | None = None,
+           kind: bytes = MAGIC_POST) -> bytes:
+    """Encode ``record``; msgpack payloads of ``compress_threshold`` bytes or more are zstd compressed."""
+    if content_type == CONTENT_TYPE_JSON:
+        return json.dumps(record).encode("utf-8")
+    if content_type != CONTENT_TYPE_MSGPACK:
+        raise ValueError(f"unsupported content type {content_type!r}")
+
+    payload = msgpack.packb([record.get(name) for name in SCHEMAS[kind][SCHEMA_VERSION]], use_bin_type=True)
+    flags = 0
+    if compress_threshold is not None and len(payload) >= compress_threshold:
+        payload = _compressor.compress(payload)
+        flags |= FLAG_ZSTD
+    return kind + bytes((SCHEMA_VERSION, flags)) + payload
+
+
+def decode(body: bytes, content_type: str | None = None) -> dict:
+    if content_type != CONTENT_TYPE_MSGPACK:
+        # messages from producers that predate content types are JSON
+        return json.loads(body.decode("utf-8"))
+
+    schemas = SCHEMAS.get(body[:2])
+    if schemas is None:
+        raise ValueError("not a msgpack RedditPost or RedditComment message")
+    version, flags = body[2], body[3]
+    fields = schemas.get(version)
+    if fields is None:
+        raise ValueError(f"unknown schema version {version}")
+    payload = body[4:]
+    if flags & FLAG_ZSTD:
+        payload = _decompressor.decompress(payload)
+    return dict(zip(fields, msgpack.unpackb(payload, raw=False)))
@@ -0,0 +1,44 @@
+"""Bytes per message and encode/decode cost of the RedditPost wire formats.
+
+    uv run bench_wire.py [messages]
+
+Posts come from the seeded MockRedditFetcher at a few selftext sizes.
+"""
+import itertools
+import sys
+import time
+from dataclasses import asdict
+
+import wire
+from main import MockRedditFetcher, TextLength
+
+
+def bench(posts: list[dict], content_type: str, compress_threshold: int | None = None) -> tuple[float, float, float]:
+    start = time.perf_counter()
+    bodies = [wire.encode(post, content_type=content_type, compress_threshold=compress_threshold) for post in posts]
+    encode_us = (time.perf_counter() - start) / len(posts) * 1e6
+
+    start = time.perf_counter()
+    for body in bodies:
+        wire.decode(body, content_type)
+    decode_us = (time.perf_counter() - start) / len(posts) * 1e6
+
+    return sum(map(len, bodies)) / len(bodies), encode_us, decode_us
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print(f"{'selftext words':>15} {'format':>8} {'bytes/msg':>10} {'encode us':>10} {'decode us':>10}")
+    for median_words in (0, 60, 400, 2000):
+        fetcher = MockRedditFetcher(
+            "", "", "", "bench",
+            target_rate=0, seed=1,
+            selftext_length=TextLength(max(median_words, 1), sigma=0.3, max_words=10_000),
+            empty_selftext_ratio=1.0 if median_words == 0 else 0.0,
+        )
+        posts = [asdict(post) for post in itertools.islice(fetcher.fetch_data(), count)]
+        for name, content_type, threshold in (("json", wire.CONTENT_TYPE_JSON, None),
+                                              ("msgpack", wire.CONTENT_TYPE_MSGPACK, None),
+                                              ("+zstd", wire.CONTENT_TYPE_MSGPACK, 2048)):
+            size, encode_us, decode_us = bench(posts, content_type, threshold)
+            print(f"{median_words:>15} {name:>8} {size:>10.0f} {encode_us:>10.2f} {decode_us:>10.2f}")
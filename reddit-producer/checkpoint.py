@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import time
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Checkpoint:
+    """Last published submission per subreddit, persisted as JSON.
+
+    Only posts the broker has confirmed should be recorded, so a restart resumes
+    from the newest post that is known to be durable.
+    """
+    def __init__(self, path: str, save_interval: float = 5.0):
+        self.path = path
+        self.save_interval = save_interval
+        self.entries: dict[str, dict] = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+            logging.info(f"loaded checkpoint for {len(self.entries)} subreddits from {path}")
+
+    def get(self, subreddit: str) -> dict | None:
+        return self.entries.get(subreddit.lower())
+
+    def last_created(self, subreddit: str) -> float | None:
+        entry = self.get(subreddit)
+        return entry['created_utc'] if entry else None
+
+    def update(self, subreddit: str, fullname: str, created_utc: float) -> None:
+        key = subreddit.lower()
+        entry = self.entries.get(key)
+        if entry is None or created_utc >= entry['created_utc']:
+            self.entries[key] = {'fullname': fullname, 'created_utc': created_utc}
+            self._dirty = True
+
+    def save(self) -> None:
+        if self._dirty:
+            _atomic_write(self.path, json.dumps(self.entries).encode())
+            self._dirty = False
+        self._last_save = time.monotonic()
+
+    def maybe_save(self) -> None:
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class SeenFilter:
+    """Rotating pair of bloom filters over post ids.
+
+    New ids go into the current generation; once it holds ``capacity`` ids it
+    becomes the previous generation and a fresh one starts, so memory stays
+    bounded while roughly the last ``capacity``..``2 * capacity`` ids are
+    remembered. False positives (a new post wrongly skipped) happen at about
+    ``error_rate``.
+    """
+    _HEADER = struct.Struct('<4sIQdQQ')  # magic, version, capacity, error_rate, current count, previous count
+    _MAGIC = b'SEEN'
+
+    def __init__(self, path: str | None = None, capacity: int = 500_000, error_rate: float = 1e-4,
+                 save_interval: float = 30.0):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.save_interval = save_interval
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous = BloomFilter(capacity, error_rate)
+        self._last_save = time.monotonic()
+        if path and os.path.exists(path):
+            self._load()
+
+    def __contains__(self, post_id: str) -> bool:
+        return post_id in self.current or post_id in self.previous
+
+    def add(self, post_id: str) -> None:
+        if self.current.count >= self.capacity:
+            self.previous = self.current
+            self.current = BloomFilter(self.capacity, self.error_rate)
+        self.current.add(post_id)
+
+    def _load(self) -> None:
+        with open(self.path, 'rb') as f:
+            magic, _version, capacity, error_rate, current_count, previous_count = \
+                self._HEADER.unpack(f.read(self._HEADER.size))
+            if magic != self._MAGIC or capacity != self.capacity or error_rate != self.error_rate:
+                logging.warning(f"ignoring seen filter at {self.path}: incompatible parameters")
+                return
+            size = len(self.current.bits)
+            self.current.bits = bytearray(f.read(size))
+            self.previous.bits = bytearray(f.read(size))
+        self.current.count = current_count
+        self.previous.count = previous_count
+        logging.info(f"loaded seen filter with {current_count + previous_count} ids from {self.path}")
+
+    def save(self) -> None:
+        if self.path:
+            header = self._HEADER.pack(self._MAGIC, 1, self.capacity, self.error_rate,
+                                       self.current.count, self.previous.count)
+            _atomic_write(self.path, header + bytes(self.current.bits) + bytes(self.previous.bits))
+        self._last_save = time.monotonic()
+
+    def maybe_save(self) -> None:
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
@@ -1,20 +1,38 @@
 import praw
+import asyncpraw
+import aio_pika
+import asyncio
+import signal
+import itertools
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import datetime
-import json
 from dotenv import load_dotenv
 import os
 from typing import Generator
 import logging 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 import pika
 import time
 import random
+import math
+
+from prometheus_client import Gauge, start_http_server
+
+from checkpoint import Checkpoint, SeenFilter
+from rate_control import AdaptiveRateController, RequestBudget
+from spill import SpillBuffer
+import wire
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s %(levelname)s [%(funcName)s] %(message)s'
 )
 
+LOADGEN_ACHIEVED_RATE = Gauge("loadgen_achieved_rate", "Posts per second actually produced by the mock load generator")
+
 @dataclass()
 class RedditPost:
     title: str
@@ -23,115 +41,1305 @@ class RedditPost:
     created_utc: float
     selftext: str
     now_time: float
+    subreddit: str = ''
+
+
+def submission_to_post(submission, subreddit: str) -> RedditPost:
+    return RedditPost(
+        title=submission.title,
+        id=submission.id,
+        url=submission.url,
+        created_utc=submission.created_utc,
+        selftext=submission.selftext,
+        now_time=datetime.datetime.now().timestamp(),
+        subreddit=subreddit,
+    )
+
+
+def catch_up_submissions(listing, checkpoint: Checkpoint, queue_name_for, limit: int = 1000) -> list:
+    """Submissions posted after their subreddit's checkpoint, oldest first.
+
+    ``listing`` is a praw Subreddit (possibly "a+b+c"); only subreddits that
+    have a checkpoint are caught up. Reddit listings stop at ~1000 items, so a
+    longer outage can still leave a gap, which is logged.
+    """
+    since_by_name = {}
+    for name in listing.display_name.split('+'):
+        since = checkpoint.last_created(name)
+        if since is not None:
+            since_by_name[name.lower()] = since
+    if not since_by_name:
+        return []
+    oldest_since = min(since_by_name.values())
+
+    missed = []
+    reached_checkpoint = False
+    for submission in listing.new(limit=limit):
+        if submission.created_utc <= oldest_since:
+            reached_checkpoint = True
+            break
+        since = since_by_name.get(queue_name_for(submission).lower())
+        if since is not None and submission.created_utc > since:
+            missed.append(submission)
+    if not reached_checkpoint:
+        logging.warning(f"catch-up for {listing.display_name} hit the {limit} post listing limit; "
+                        f"posts older than that were missed")
+    logging.info(f"catching up {len(missed)} posts for {listing.display_name}")
+    return list(reversed(missed))
+
+
+@dataclass()
+class RedditComment:
+    body: str
+    id: str
+    link_id: str
+    parent_id: str
+    author: str
+    created_utc: float
+    now_time: float
+    subreddit: str = ''
+
+
+def comment_to_record(comment, subreddit: str) -> RedditComment:
+    return RedditComment(
+        body=comment.body,
+        id=comment.id,
+        link_id=comment.link_id,
+        parent_id=comment.parent_id,
+        author=str(comment.author),
+        created_utc=comment.created_utc,
+        now_time=datetime.datetime.now().timestamp(),
+        subreddit=subreddit,
+    )
+
+
+# Posts go to the "<subreddit>" queue and comments to "<subreddit>.comments".
+# Checkpoints are kept per queue and the seen filter is keyed by message id;
+# comment ids are fullnames ("t1_...") since they share a namespace with posts.
+def queue_name_for(item: RedditPost | RedditComment) -> str:
+    if isinstance(item, RedditComment):
+        return f"{item.subreddit}.comments"
+    return item.subreddit
+
+
+def message_id_for(item: RedditPost | RedditComment) -> str:
+    if isinstance(item, RedditComment):
+        return f"t1_{item.id}"
+    return item.id
+
+
+def fullname_for(item: RedditPost | RedditComment) -> str:
+    return f"t1_{item.id}" if isinstance(item, RedditComment) else f"t3_{item.id}"
+
+
+def wire_kind(item: RedditPost | RedditComment) -> bytes:
+    return wire.MAGIC_COMMENT if isinstance(item, RedditComment) else wire.MAGIC_POST
+
 
 class RedditFetcher:
-    def __init__(self, client_id:str, client_secret:str, user_agent:str, subreddit:str):
+    def __init__(self, client_id:str, client_secret:str, user_agent:str, subreddit:str,
+                 checkpoint: Checkpoint | None = None, seen: SeenFilter | None = None,
+                 requests_per_minute: float = 60.0):
         self.reddit = praw.Reddit(
             client_id = client_id,
             client_secret = client_secret,
             user_agent = user_agent
         )
         self.subreddit = subreddit
+        self.checkpoint = checkpoint
+        self.seen = seen
+        self.budget = RequestBudget(requests_per_minute)
+
 
+    def fetch_data(self)->Generator[RedditPost | None, None, None]:
+        """Yields posts, and None whenever the stream has nothing new (a cue to flush).
 
-    def fetch_data(self)->Generator[RedditPost, None, None]:
+        pause_after=0 turns off praw's own backoff between empty polls, so an
+        idle stream is re-polled no faster than ``requests_per_minute``.
+        """
         subreddit = self.reddit.subreddit(self.subreddit)
-        for submission in subreddit.stream.submissions(skip_existing = True):
-            yield RedditPost(
-                title=submission.title,
-                id=submission.id,
-                url=submission.url,
-                created_utc=submission.created_utc,
-                selftext=submission.selftext,
-                now_time=datetime.datetime.now().timestamp(),
-            )
+        resuming = self.checkpoint is not None and self.checkpoint.get(self.subreddit) is not None
+        yielded: set[str] = set()
+        if resuming:
+            for submission in catch_up_submissions(subreddit, self.checkpoint, lambda _s: self.subreddit):
+                if self.seen is not None and submission.id in self.seen:
+                    continue
+                yielded.add(submission.id)
+                yield submission_to_post(submission, self.subreddit)
+
+        # When resuming, the stream's initial batch overlaps the catch-up and the
+        # seen filter drops whatever was already published.
+        for submission in subreddit.stream.submissions(skip_existing = not resuming, pause_after=0):
+            if submission is None:
+                yield None
+                self.budget.wait()
+                continue
+            if submission.id in yielded or (self.seen is not None and submission.id in self.seen):
+                continue
+            yield submission_to_post(submission, self.subreddit)
+
+
+class MultiRedditFetcher:
+    """Streams many subreddits from one praw client.
+
+    Subreddits are joined into groups of ``group_size`` ("a+b+c") so one listing
+    request covers a whole group. The group streams are polled round robin, each
+    turn yielding at most ``quantum`` posts, and every turn draws on a shared
+    ``requests_per_minute`` budget so no single busy group can starve the rest.
+    With ``include_comments`` each group also gets a comment stream in the
+    same rotation. A stream with nothing new yields None, a cue to flush.
+    """
+    def __init__(self, client_id: str, client_secret: str, user_agent: str,
+                 subreddits: list[str] | None = None, multireddit: str | None = None,
+                 group_size: int = 25, quantum: int = 10, requests_per_minute: float = 60.0,
+                 checkpoint: Checkpoint | None = None, seen: SeenFilter | None = None,
+                 include_comments: bool = False):
+        self.reddit = praw.Reddit(
+            client_id = client_id,
+            client_secret = client_secret,
+            user_agent = user_agent
+        )
+        self.subreddits = list(subreddits or [])
+        if multireddit:
+            # "redditor/name"
+            redditor, name = multireddit.split('/', 1)
+            multi = self.reddit.multireddit(redditor=redditor, name=name)
+            self.subreddits.extend(sub.display_name for sub in multi.subreddits)
+        if not self.subreddits:
+            raise ValueError("MultiRedditFetcher needs at least one subreddit or a multireddit")
+        # Reddit reports display_name in its own casing; route to the configured name.
+        self.queue_names = {name.lower(): name for name in self.subreddits}
+        self.group_size = group_size
+        self.quantum = quantum
+        self.budget = RequestBudget(requests_per_minute)
+        self.checkpoint = checkpoint
+        self.seen = seen
+        self.include_comments = include_comments
+
+    def _queue_name(self, submission) -> str:
+        name = submission.subreddit.display_name
+        return self.queue_names.get(name.lower(), name)
+
+    def fetch_data(self) -> Generator[RedditPost | RedditComment | None, None, None]:
+        groups = [self.subreddits[i:i + self.group_size]
+                  for i in range(0, len(self.subreddits), self.group_size)]
+        listings = [self.reddit.subreddit('+'.join(group)) for group in groups]
+        yielded: set[str] = set()
+        streams = []
+        for group, listing in zip(groups, listings):
+            resuming = self.checkpoint is not None and any(self.checkpoint.get(name) for name in group)
+            if resuming:
+                self.budget.wait()
+                for submission in catch_up_submissions(listing, self.checkpoint, self._queue_name):
+                    if self.seen is not None and submission.id in self.seen:
+                        continue
+                    yielded.add(submission.id)
+                    yield submission_to_post(submission, self._queue_name(submission))
+            streams.append((submission_to_post, '',
+                            listing.stream.submissions(skip_existing=not resuming, pause_after=0)))
+            if self.include_comments:
+                # no catch-up listing for comments; a resumed stream's first batch covers short gaps
+                resuming = self.checkpoint is not None and \
+                    any(self.checkpoint.get(f"{name}.comments") for name in group)
+                streams.append((comment_to_record, 't1_',
+                                listing.stream.comments(skip_existing=not resuming, pause_after=0)))
+        logging.info(f"streaming {len(self.subreddits)} subreddits in {len(groups)} groups"
+                     + (" with comments" if self.include_comments else ""))
+
+        while True:
+            for convert, id_prefix, stream in streams:
+                self.budget.wait()
+                for _ in range(self.quantum):
+                    item = next(stream)
+                    if item is None:
+                        # group is caught up, give the next one a turn
+                        yield None
+                        break
+                    seen_id = id_prefix + item.id
+                    if seen_id in yielded or (self.seen is not None and seen_id in self.seen):
+                        continue
+                    yield convert(item, self._queue_name(item))
+
+
+class BackfillFetcher:
+    """Pages through subreddit history for posts created between ``start`` and ``end``.
+
+    Reddit listings stop at ~1000 posts and can no longer be searched by
+    timestamp, so coverage comes from walking several listings per subreddit
+    ("new", "top:all", "top:year", "controversial:month", ...). Each
+    (subreddit, listing) pair is one unit of work for a pool of ``workers``
+    threads, each with its own praw client; every page request draws on one
+    shared ``requests_per_minute`` budget. Posts seen in another listing, or
+    already published according to the seen filter, are skipped.
+    """
+    PAGE_SIZE = 100
+
+    def __init__(self, client_id: str, client_secret: str, user_agent: str,
+                 subreddits: list[str], start: float, end: float,
+                 listings: list[str] | None = None, workers: int = 4,
+                 requests_per_minute: float = 60.0, seen: SeenFilter | None = None):
+        self.credentials = dict(client_id=client_id, client_secret=client_secret, user_agent=user_agent)
+        self.reddit = praw.Reddit(**self.credentials)
+        self.subreddits = subreddits
+        self.start = start
+        self.end = end
+        self.listings = listings or ['new', 'top:all', 'top:year', 'top:month', 'controversial:all']
+        self.workers = workers
+        self.budget = RequestBudget(requests_per_minute)
+        self.seen = seen
+        self._local = threading.local()
+
+    def _client(self) -> praw.Reddit:
+        if not hasattr(self._local, 'reddit'):
+            self._local.reddit = praw.Reddit(**self.credentials)
+        return self._local.reddit
+
+    def _listing(self, subreddit: str, spec: str):
+        sort, _, time_filter = spec.partition(':')
+        sub = self._client().subreddit(subreddit)
+        if sort in ('top', 'controversial'):
+            return getattr(sub, sort)(time_filter=time_filter or 'all', limit=None)
+        if sort in ('new', 'hot', 'rising'):
+            return getattr(sub, sort)(limit=None)
+        raise ValueError(f"unknown backfill listing {spec!r}")
+
+    @staticmethod
+    def _put(out: queue.Queue, item, stop: threading.Event) -> bool:
+        """Put ``item`` unless ``stop`` is set first; False if it was dropped."""
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _walk(self, subreddit: str, spec: str, out: queue.Queue, stop: threading.Event) -> int:
+        found = 0
+        for i, submission in enumerate(self._listing(subreddit, spec)):
+            if stop.is_set():
+                break
+            if i % self.PAGE_SIZE == 0:
+                self.budget.wait()
+            if submission.created_utc > self.end:
+                continue
+            if submission.created_utc < self.start:
+                if spec == 'new':
+                    # newest first, everything after this is older still
+                    break
+                continue
+            if not self._put(out, submission_to_post(submission, subreddit), stop):
+                break
+            found += 1
+        logging.info(f"backfill {subreddit} {spec}: {found} posts in range")
+        return found
+
+    def fetch_data(self) -> Generator[RedditPost, None, None]:
+        out: queue.Queue = queue.Queue(maxsize=1000)
+        done = object()
+        # set when the consumer closes the generator early, so workers blocked on a full queue exit
+        stop = threading.Event()
+        units = [(subreddit, spec) for subreddit in self.subreddits for spec in self.listings]
+
+        def work(subreddit: str, spec: str) -> None:
+            try:
+                self._walk(subreddit, spec, out, stop)
+            except Exception:
+                logging.exception(f"backfill {subreddit} {spec} failed")
+            finally:
+                self._put(out, done, stop)
+
+        published: set[str] = set()
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for subreddit, spec in units:
+                pool.submit(work, subreddit, spec)
+            remaining = len(units)
+            while remaining:
+                post = out.get()
+                if post is done:
+                    remaining -= 1
+                    continue
+                if post.id in published or (self.seen is not None and post.id in self.seen):
+                    continue
+                published.add(post.id)
+                yield post
+        finally:
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+        logging.info(f"backfill finished: {len(published)} posts from {len(units)} listings")
+
+
+DEFAULT_VOCABULARY: list[str] = [
+    "community", "amazing", "disappointing", "incredible", "achievement", "happening",
+    "love", "helpful", "everyone", "bad", "inspired", "comments", "frustrated", "lack",
+    "progress", "made", "day", "situation", "discouraging", "advice", "helped", "grow",
+    "let", "down", "outcome", "great", "terrible", "why", "does", "this", "keep", "really",
+    "so", "not", "very", "the", "is", "and", "I", "we", "they", "here", "what", "an",
+]
+
+
+@dataclass()
+class TextLength:
+    """Log-normal word count: median ``median_words``, spread ``sigma``, capped at ``max_words``."""
+    median_words: float
+    sigma: float = 0.8
+    max_words: int = 2000
+
+    def sample(self, rng: random.Random) -> int:
+        return max(1, min(self.max_words, round(rng.lognormvariate(math.log(self.median_words), self.sigma))))
+
+
+@dataclass()
+class BurstProfile:
+    """Every ``period`` seconds, run at ``multiplier`` x the target rate for ``duration`` seconds."""
+    period: float
+    duration: float
+    multiplier: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "BurstProfile":
+        # "period:duration:multiplier", e.g. "60:10:5"
+        period, duration, multiplier = (float(part) for part in spec.split(':'))
+        return cls(period, duration, multiplier)
+
+    def factor(self, elapsed: float) -> float:
+        return self.multiplier if elapsed % self.period < self.duration else 1.0
+
 
 class MockRedditFetcher:
-    """Simulates fetching Reddit posts without hitting Reddit's API."""
-    def __init__(self, client_id: str, client_secret: str, user_agent: str, subreddit: str):
-        self.subreddit = subreddit
+    """Deterministic synthetic post generator for load testing without Reddit's API.
 
-    def fetch_data(self) -> Generator["RedditPost", None, None]:
-        i: int = 0
-        base_titles: list[str] = [
-            "This community is amazing!",
-            "This is so disappointing.",
-            "What an incredible achievement!",
-            "Why does this keep happening?",
-            "I love how helpful everyone is here.",
-            "I can't believe how bad this is."
-        ]
-
-        selftexts: list[str] = [
-            "I'm feeling so inspired after reading these comments.",
-            "I'm frustrated with the lack of progress.",
-            "This made my day!",
-            "This situation is really discouraging.",
-            "The advice here has really helped me grow.",
-            "I feel let down by the outcome."
-        ]
+    Posts are paced open-loop at ``target_rate`` per second (0 means as fast as
+    possible), optionally shaped by a ``burst_profile``. Titles and selftexts are
+    drawn from ``vocabulary`` with log-normal word counts; ``duplicate_ratio`` of
+    texts are repeats of earlier ones. The same ``seed`` gives the same sequence.
+    ``comments_per_post`` comments (on average) follow each post, on top of
+    the post rate.
+    """
+    def __init__(self, client_id: str, client_secret: str, user_agent: str, subreddit: str | list[str],
+                 target_rate: float = 0.5, seed: int = 0, vocabulary: list[str] | None = None,
+                 title_length: TextLength | None = None, selftext_length: TextLength | None = None,
+                 duplicate_ratio: float = 0.0, empty_selftext_ratio: float = 0.0,
+                 burst_profile: BurstProfile | None = None, report_interval: float = 10.0,
+                 comments_per_post: float = 0.0):
+        self.subreddits = [subreddit] if isinstance(subreddit, str) else list(subreddit)
+        self.target_rate = target_rate
+        self.seed = seed
+        self.vocabulary = vocabulary or DEFAULT_VOCABULARY
+        self.title_length = title_length or TextLength(median_words=8, sigma=0.5, max_words=50)
+        self.selftext_length = selftext_length or TextLength(median_words=60, sigma=1.0)
+        self.duplicate_ratio = duplicate_ratio
+        self.empty_selftext_ratio = empty_selftext_ratio
+        self.burst_profile = burst_profile
+        self.report_interval = report_interval
+        self.comments_per_post = comments_per_post
+
+        self.generated: int = 0
+        self.comments_generated: int = 0
+        self._started: float | None = None
+
+    @property
+    def achieved_rate(self) -> float:
+        if self._started is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started
+        return self.generated / elapsed if elapsed > 0 else 0.0
+
+    def _text(self, rng: random.Random, length: TextLength, seen: list[str]) -> str:
+        if seen and rng.random() < self.duplicate_ratio:
+            return rng.choice(seen)
+        text = ' '.join(rng.choices(self.vocabulary, k=length.sample(rng)))
+        if len(seen) < 10_000:
+            seen.append(text)
+        return text
+
+    def fetch_data(self) -> Generator["RedditPost | RedditComment | None", None, None]:
+        """Yields posts and comments, and None before pausing for the target rate (a cue to flush)."""
+        rng = random.Random(self.seed)
+        seen_titles: list[str] = []
+        seen_selftexts: list[str] = []
+        self._started = time.monotonic()
+        next_send = self._started
+        last_report = self._started
 
         while True:
+            now = time.monotonic()
+            if self.target_rate > 0:
+                # open-loop pacing: when behind schedule, send without sleeping to catch up
+                if next_send > now:
+                    yield None
+                    time.sleep(max(0.0, next_send - time.monotonic()))
+                factor = self.burst_profile.factor(now - self._started) if self.burst_profile else 1.0
+                next_send += 1.0 / (self.target_rate * factor)
+
+            i = self.generated
+            if rng.random() < self.empty_selftext_ratio:
+                selftext = ''
+            else:
+                selftext = self._text(rng, self.selftext_length, seen_selftexts)
             yield RedditPost(
-                title=f"{random.choice(base_titles)} - {i}",
-                id=f"id_{i}",
+                title=self._text(rng, self.title_length, seen_titles),
+                id=f"mock{self.seed}_{i}",
                 url=f"http://example.com/{i}",
                 created_utc=datetime.datetime.now().timestamp(),
-                selftext=random.choice(selftexts),
+                selftext=selftext,
                 now_time=datetime.datetime.now().timestamp(),
+                subreddit=self.subreddits[i % len(self.subreddits)],
             )
-            i += 1
+            self.generated += 1
+
+            if self.comments_per_post > 0:
+                whole, fraction = divmod(self.comments_per_post, 1)
+                for j in range(int(whole) + (rng.random() < fraction)):
+                    yield RedditComment(
+                        body=self._text(rng, self.selftext_length, seen_selftexts),
+                        id=f"mock{self.seed}_{i}_{j}",
+                        link_id=f"t3_mock{self.seed}_{i}",
+                        parent_id=f"t3_mock{self.seed}_{i}",
+                        author="mock",
+                        created_utc=datetime.datetime.now().timestamp(),
+                        now_time=datetime.datetime.now().timestamp(),
+                        subreddit=self.subreddits[i % len(self.subreddits)],
+                    )
+                    self.comments_generated += 1
+
+            now = time.monotonic()
+            if now - last_report >= self.report_interval:
+                LOADGEN_ACHIEVED_RATE.set(self.achieved_rate)
+                logging.info(f"load generator: {self.generated} posts, "
+                             f"achieved {self.achieved_rate:.1f}/s (target {self.target_rate}/s)")
+                last_report = now
+
+
+class PublishError(Exception):
+    """Raised when the broker nacks (or never confirms) a published message."""
+
+
+@dataclass()
+class PendingMessage:
+    queue_name: str
+    body: str | bytes
+    message_id: str
+    content_type: str = wire.CONTENT_TYPE_JSON
+
+
+@dataclass()
+class PublishResult:
+    confirmed: list[str] = field(default_factory=list)
+    nacked: list[str] = field(default_factory=list)
+    # written to the spill log instead; durable, and replayed once the broker is back
+    spilled: list[str] = field(default_factory=list)
+
 
 class RabbitMQPublisher:
-    def __init__(self, username: str, password:str, port: int, host: str):
+    """Batched publisher with pipelined confirms.
+
+    With a ``spill`` buffer, messages that cannot be published (broker down,
+    nacked, or unconfirmed within ``confirm_timeout``) are written to disk
+    instead of raising. While the log is non-empty new messages are appended
+    behind it too, and each flush first replays from it, so delivery order is
+    kept once the broker is back.
+    """
+    def __init__(self, username: str, password:str, port: int, host: str,
+                 batch_size: int = 500, flush_interval: float = 0.05, confirm_timeout: float = 30.0,
+                 spill: SpillBuffer | None = None, reconnect_interval: float = 5.0, replay_batches: int = 10):
         self.credentials = pika.PlainCredentials(username=username, password=password)
         self.parameters = pika.ConnectionParameters(host = host, port = port, credentials=self.credentials)
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.confirm_timeout = confirm_timeout
+        self.spill = spill
+        self.reconnect_interval = reconnect_interval
+        self.replay_batches = replay_batches
+
+        self._buffer: list[PendingMessage] = []
+        self._buffer_started: float = 0.0
+        self._result = PublishResult()
+        self.last_confirm_latency: float | None = None
+        self.connection: pika.BlockingConnection | None = None
+        self._last_connect_attempt: float = 0.0
+        try:
+            self._connect()
+        except pika.exceptions.AMQPConnectionError:
+            if spill is None:
+                raise
+            logging.warning("broker unavailable at startup, spilling to disk until it is back")
+
+    def _connect(self) -> None:
+        self._last_connect_attempt = time.monotonic()
         self.connection = pika.BlockingConnection(parameters=self.parameters)
         self.channel = self.connection.channel()
-    
-    def publish(self, queue_name:str, message: str) -> None:
+        self._declared_queues: set[str] = set()
+        # delivery tag -> message id for everything published but not yet confirmed
+        self._unconfirmed: dict[int, str] = {}
+        self._delivery_tag: int = 0
+        self._enable_confirms()
+
+    def _disconnect(self) -> None:
+        try:
+            if self.connection is not None and self.connection.is_open:
+                self.connection.close()
+        except pika.exceptions.AMQPError:
+            pass
+        self.connection = None
+
+    def _ensure_connected(self) -> bool:
+        if self.connection is not None and self.connection.is_open:
+            return True
+        if time.monotonic() - self._last_connect_attempt < self.reconnect_interval:
+            return False
+        try:
+            self._connect()
+            logging.info("reconnected to broker")
+            return True
+        except pika.exceptions.AMQPConnectionError as e:
+            logging.warning(f"broker still unavailable: {e!r}")
+            self.connection = None
+            return False
+
+    def _enable_confirms(self) -> None:
+        # BlockingChannel.confirm_delivery() waits for a broker ack after every
+        # basic_publish, i.e. one round trip per message. Registering the ack/nack
+        # callback on the underlying channel lets a whole batch go out before we
+        # wait, so confirms are pipelined.
+        selected: list[bool] = []
+        self.channel._impl.confirm_delivery(
+            ack_nack_callback=self._on_confirm,
+            callback=lambda _frame: selected.append(True),
+        )
+        while not selected:
+            self.connection.process_data_events(time_limit=1)
+
+    def _on_confirm(self, frame) -> None:
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        if method.multiple:
+            tags = [tag for tag in self._unconfirmed if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+        for tag in tags:
+            message_id = self._unconfirmed.pop(tag, None)
+            if message_id is None:
+                continue
+            if acked:
+                self._result.confirmed.append(message_id)
+            else:
+                self._result.nacked.append(message_id)
+
+    def declare_queue(self, queue_name: str) -> None:
+        if queue_name in self._declared_queues:
+            return
         self.channel.queue_declare(queue=queue_name, durable=True)
-        self.channel.basic_publish(exchange='',
-                                   routing_key=queue_name,
-                                   body=message,
-                                   properties=pika.BasicProperties(
-                                       delivery_mode=2,
-                                   ))
-    
+        self._declared_queues.add(queue_name)
+
+    def enqueue(self, queue_name: str, message: str | bytes, message_id: str,
+                content_type: str = wire.CONTENT_TYPE_JSON) -> PublishResult | None:
+        """Buffer a message; flushes once batch_size or flush_interval is reached.
+
+        Returns the PublishResult of the flush if one happened, else None.
+        """
+        if not self._buffer:
+            self._buffer_started = time.monotonic()
+        self._buffer.append(PendingMessage(queue_name, message, message_id, content_type))
+        if self.flush_due():
+            return self.flush()
+        return None
+
+    def buffered(self) -> int:
+        return len(self._buffer)
+
+    def flush_due(self) -> bool:
+        if not self._buffer:
+            return False
+        return (len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._buffer_started >= self.flush_interval)
+
+    def flush(self) -> PublishResult:
+        """Publish everything buffered and block until the broker confirms or nacks it."""
+        pending, self._buffer = self._buffer, []
+        if self.spill is None:
+            return self.publish_batch(pending)
+
+        result = PublishResult()
+        self._replay()
+        if not self.spill.empty() or not self._ensure_connected():
+            self._spill(pending, result)
+            return result
+        try:
+            batch = self.publish_batch(pending)
+        except pika.exceptions.AMQPError as e:
+            logging.warning(f"publish failed, spilling {len(pending)} messages: {e!r}")
+            batch = self._result
+            self._result = PublishResult()
+            self._disconnect()
+            batch.nacked = [m.message_id for m in pending if m.message_id not in set(batch.confirmed)]
+        result.confirmed.extend(batch.confirmed)
+        failed = set(batch.nacked)
+        self._spill([m for m in pending if m.message_id in failed], result)
+        return result
+
+    def _spill(self, messages: list[PendingMessage], result: PublishResult) -> None:
+        self.spill.append([
+            (m.queue_name, m.body.encode() if isinstance(m.body, str) else m.body, m.message_id, m.content_type)
+            for m in messages
+        ])
+        result.spilled.extend(m.message_id for m in messages)
+
+    def _replay(self) -> None:
+        """Republish up to ``replay_batches`` batches from the spill log, oldest first."""
+        for _ in range(self.replay_batches):
+            if self.spill.empty() or not self._ensure_connected():
+                return
+            started = time.monotonic()
+            records, position = self.spill.read(self.batch_size)
+            try:
+                batch = self.publish_batch([PendingMessage(*record) for record in records])
+            except pika.exceptions.AMQPError as e:
+                logging.warning(f"replay failed: {e!r}")
+                self._disconnect()
+                return
+            if batch.nacked:
+                # keep the cursor; the whole batch is retried (consumers see duplicates)
+                logging.warning(f"{len(batch.nacked)} replayed messages nacked, retrying later")
+                return
+            self.spill.commit(position, len(records), time.monotonic() - started)
+
+    def publish_batch(self, messages: list[PendingMessage]) -> PublishResult:
+        self._result = PublishResult()
+        for message in messages:
+            self.declare_queue(message.queue_name)
+        for message in messages:
+            self.channel._impl.basic_publish(
+                exchange='',
+                routing_key=message.queue_name,
+                body=message.body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,
+                    message_id=message.message_id,
+                    content_type=message.content_type,
+                ),
+            )
+            self._delivery_tag += 1
+            self._unconfirmed[self._delivery_tag] = message.message_id
+
+        started = time.monotonic()
+        deadline = started + self.confirm_timeout
+        while self._unconfirmed and time.monotonic() < deadline:
+            self.connection.process_data_events(time_limit=0.1)
+
+        if messages:
+            self.last_confirm_latency = time.monotonic() - started
+
+        if self._unconfirmed:
+            logging.warning(f"{len(self._unconfirmed)} messages unconfirmed after {self.confirm_timeout}s")
+            self._result.nacked.extend(self._unconfirmed.values())
+            self._unconfirmed.clear()
+
+        result = self._result
+        self._result = PublishResult()
+        return result
+
+    def queue_depth(self) -> int | None:
+        """Ready-message count of the deepest queue this publisher writes to."""
+        if self.connection is None:
+            return None
+        depth = 0
+        try:
+            for queue_name in self._declared_queues:
+                frame = self.channel.queue_declare(queue=queue_name, passive=True)
+                depth = max(depth, frame.method.message_count)
+        except pika.exceptions.AMQPError:
+            self._disconnect()
+            return None
+        return depth
+
+    def publish(self, queue_name:str, message: str | bytes, message_id: str = '',
+                content_type: str = wire.CONTENT_TYPE_JSON) -> None:
+        result = self.publish_batch([PendingMessage(queue_name, message, message_id, content_type)])
+        if result.nacked:
+            raise PublishError(f"broker did not confirm message {message_id!r} on {queue_name!r}")
+
+class AsyncRedditFetcher:
+    """asyncpraw counterpart of MultiRedditFetcher for the asyncio producer.
+
+    Each subreddit group is streamed by its own task straight into the shared
+    bounded queue, so a full queue (slow broker) pauses the streams instead of
+    buffering without limit. Listing requests share one requests-per-minute
+    budget.
+    """
+    def __init__(self, client_id: str, client_secret: str, user_agent: str,
+                 subreddits: list[str] | None = None, multireddit: str | None = None,
+                 group_size: int = 25, requests_per_minute: float = 60.0,
+                 checkpoint: Checkpoint | None = None, seen: SeenFilter | None = None,
+                 include_comments: bool = False):
+        self.reddit = asyncpraw.Reddit(
+            client_id = client_id,
+            client_secret = client_secret,
+            user_agent = user_agent
+        )
+        self.subreddits = list(subreddits or [])
+        self.multireddit = multireddit
+        self.group_size = group_size
+        self.min_turn_interval = 60.0 / requests_per_minute
+        self.checkpoint = checkpoint
+        self.seen = seen
+        self.include_comments = include_comments
+        self.queue_names: dict[str, str] = {}
+        self._budget_lock = asyncio.Lock()
+        self._last_turn: float = 0.0
+
+    async def _wait_for_budget(self) -> None:
+        async with self._budget_lock:
+            wait = self._last_turn + self.min_turn_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_turn = time.monotonic()
+
+    def _queue_name(self, submission) -> str:
+        name = submission.subreddit.display_name
+        return self.queue_names.get(name.lower(), name)
+
+    def _is_new(self, submission, yielded: set[str]) -> bool:
+        return submission.id not in yielded and (self.seen is None or submission.id not in self.seen)
+
+    async def _catch_up(self, listing, group: list[str], limit: int = 1000) -> list:
+        since_by_name = {}
+        for name in group:
+            since = self.checkpoint.last_created(name)
+            if since is not None:
+                since_by_name[name.lower()] = since
+        oldest_since = min(since_by_name.values())
+        missed = []
+        async for submission in listing.new(limit=limit):
+            if submission.created_utc <= oldest_since:
+                break
+            since = since_by_name.get(self._queue_name(submission).lower())
+            if since is not None and submission.created_utc > since:
+                missed.append(submission)
+        logging.info(f"catching up {len(missed)} posts for {'+'.join(group)}")
+        return list(reversed(missed))
+
+    async def _stream_group(self, group: list[str], queue: asyncio.Queue) -> None:
+        listing = await self.reddit.subreddit('+'.join(group))
+        yielded: set[str] = set()
+        resuming = self.checkpoint is not None and any(self.checkpoint.get(name) for name in group)
+        if resuming:
+            await self._wait_for_budget()
+            for submission in await self._catch_up(listing, group):
+                if self._is_new(submission, yielded):
+                    yielded.add(submission.id)
+                    await queue.put(submission_to_post(submission, self._queue_name(submission)))
+
+        async for submission in listing.stream.submissions(skip_existing=not resuming, pause_after=0):
+            if submission is None:
+                await self._wait_for_budget()
+                continue
+            if self._is_new(submission, yielded):
+                await queue.put(submission_to_post(submission, self._queue_name(submission)))
+
+    async def _stream_group_comments(self, group: list[str], queue: asyncio.Queue) -> None:
+        listing = await self.reddit.subreddit('+'.join(group))
+        resuming = self.checkpoint is not None and \
+            any(self.checkpoint.get(f"{name}.comments") for name in group)
+        async for comment in listing.stream.comments(skip_existing=not resuming, pause_after=0):
+            if comment is None:
+                await self._wait_for_budget()
+                continue
+            if self.seen is None or f"t1_{comment.id}" not in self.seen:
+                await queue.put(comment_to_record(comment, self._queue_name(comment)))
+
+    async def produce(self, queue: asyncio.Queue) -> None:
+        if self.multireddit:
+            redditor, name = self.multireddit.split('/', 1)
+            multi = await self.reddit.multireddit(redditor=redditor, name=name)
+            await multi.load()
+            self.subreddits.extend(sub.display_name for sub in multi.subreddits)
+        if not self.subreddits:
+            raise ValueError("AsyncRedditFetcher needs at least one subreddit or a multireddit")
+        self.queue_names = {name.lower(): name for name in self.subreddits}
+        groups = [self.subreddits[i:i + self.group_size]
+                  for i in range(0, len(self.subreddits), self.group_size)]
+        logging.info(f"streaming {len(self.subreddits)} subreddits in {len(groups)} groups")
+        try:
+            tasks = [self._stream_group(group, queue) for group in groups]
+            if self.include_comments:
+                tasks += [self._stream_group_comments(group, queue) for group in groups]
+            await asyncio.gather(*tasks)
+        finally:
+            await self.reddit.close()
+
+
+class AsyncFetcherAdapter:
+    """Runs a blocking fetcher (e.g. MockRedditFetcher) in a thread for the asyncio producer."""
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+        self.reddit = getattr(fetcher, 'reddit', None)
+
+    async def produce(self, queue: asyncio.Queue) -> None:
+        posts = self.fetcher.fetch_data()
+        while True:
+            item = await asyncio.to_thread(next, posts)
+            if item is not None:           # idle cue; publishing here isn't batched
+                await queue.put(item)
+
+
+class AsyncRabbitMQPublisher:
+    """aio-pika publisher with publisher confirms and at most ``max_in_flight`` unconfirmed messages.
+
+    With a ``spill`` buffer, callers write messages that fail to publish to
+    the same on-disk log the blocking publisher uses, and keep writing new
+    ones behind it until ``replay`` has republished it, so delivery order is
+    kept once the broker is reachable again.
+    """
+    def __init__(self, username: str, password: str, port: int, host: str, max_in_flight: int = 1000,
+                 confirm_timeout: float = 30.0, spill: SpillBuffer | None = None,
+                 reconnect_interval: float = 5.0, replay_batches: int = 10):
+        self.username = username
+        self.password = password
+        self.port = port
+        self.host = host
+        self.max_in_flight = max_in_flight
+        self.confirm_timeout = confirm_timeout
+        self.spill = spill
+        self.reconnect_interval = reconnect_interval
+        self.replay_batches = replay_batches
+        self.connection: aio_pika.abc.AbstractRobustConnection | None = None
+        self.channel: aio_pika.abc.AbstractChannel | None = None
+        self.last_confirm_latency: float | None = None
+        self._queues: dict[str, aio_pika.abc.AbstractQueue] = {}
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._last_connect_attempt: float = 0.0
+
+    async def connect(self) -> None:
+        self._last_connect_attempt = time.monotonic()
+        self.connection = await aio_pika.connect_robust(
+            host=self.host, port=self.port, login=self.username, password=self.password,
+        )
+        self.channel = await self.connection.channel(publisher_confirms=True)
+
+    def connected(self) -> bool:
+        return self.connection is not None and not self.connection.is_closed and self.channel is not None
+
+    async def ensure_connected(self) -> bool:
+        """Connect if need be, at most every ``reconnect_interval`` seconds; True once connected."""
+        if self.connected():
+            return True
+        if time.monotonic() - self._last_connect_attempt < self.reconnect_interval:
+            return False
+        try:
+            await self.connect()
+            logging.info("connected to broker")
+            return True
+        except (aio_pika.exceptions.AMQPConnectionError, ConnectionError, OSError) as e:
+            logging.warning(f"broker still unavailable: {e!r}")
+            self.connection = self.channel = None
+            return False
+
+    def must_spill(self) -> bool:
+        """Whether new messages go to the spill log: it still holds a backlog, or the broker is down."""
+        return self.spill is not None and (not self.spill.empty() or not self.connected())
+
+    async def declare_queue(self, queue_name: str) -> None:
+        if queue_name not in self._queues:
+            self._queues[queue_name] = await self.channel.declare_queue(queue_name, durable=True)
+
+    async def queue_depth(self) -> int | None:
+        """Ready-message count of the deepest queue this publisher writes to."""
+        if not self.connected():
+            return None
+        depth = 0
+        try:
+            for queue_name in self._queues:
+                queue = await self.channel.declare_queue(queue_name, passive=True)
+                depth = max(depth, queue.declaration_result.message_count)
+        except (aio_pika.exceptions.AMQPError, ConnectionError, RuntimeError):
+            return None
+        return depth
+
+    async def publish(self, queue_name: str, body: bytes, message_id: str, content_type: str) -> bool:
+        """Publish one message and wait for its confirm; True if the broker acked it.
+
+        Connection and channel errors, and confirms slower than
+        ``confirm_timeout``, are raised.
+        """
+        await self.declare_queue(queue_name)
+        async with self._in_flight:
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self.channel.default_exchange.publish(
+                    aio_pika.Message(
+                        body,
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                        message_id=message_id,
+                        content_type=content_type,
+                    ),
+                    routing_key=queue_name,
+                ), self.confirm_timeout)
+            except aio_pika.exceptions.DeliveryError:
+                return False
+            finally:
+                self.last_confirm_latency = time.monotonic() - started
+        return True
+
+    async def replay(self) -> None:
+        """Republish up to ``replay_batches`` batches from the spill log, oldest first."""
+        for _ in range(self.replay_batches):
+            if self.spill is None or self.spill.empty() or not self.connected():
+                return
+            started = time.monotonic()
+            records, position = self.spill.read(self.max_in_flight)
+            results = await asyncio.gather(*(self.publish(*record) for record in records), return_exceptions=True)
+            if not all(result is True for result in results):
+                # keep the cursor; the whole batch is retried (consumers see duplicates)
+                failed = [result for result in results if result is not True]
+                logging.warning(f"{len(failed)} replayed messages failed, retrying later: {failed[0]!r}")
+                return
+            self.spill.commit(position, len(records), time.monotonic() - started)
+
+    async def close(self) -> None:
+        if self.connection is not None:
+            await self.connection.close()
+
+
+class ConfirmWindow:
+    """Records posts in the checkpoint in the order they were taken off the fetch queue.
+
+    Publisher tasks finish out of order and ``Checkpoint.update`` keeps the
+    newest ``created_utc``, so recording a post while an older one for the
+    same queue is still in flight would let a restart skip the older one if
+    it then fails. Each queue's checkpoint only moves up to just before its
+    oldest post that is not yet durable.
+    """
+    def __init__(self, checkpoint: Checkpoint):
+        self.checkpoint = checkpoint
+        self._tokens = itertools.count()
+        # queue name -> token -> the post once durable, None while in flight (in take order)
+        self._windows: dict[str, dict[int, RedditPost | RedditComment | None]] = defaultdict(dict)
+
+    def start(self, item: RedditPost | RedditComment) -> int:
+        token = next(self._tokens)
+        self._windows[queue_name_for(item)][token] = None
+        return token
+
+    def finish(self, token: int, item: RedditPost | RedditComment) -> None:
+        window = self._windows[queue_name_for(item)]
+        window[token] = item
+        for oldest, done in list(window.items()):
+            if done is None:
+                break
+            del window[oldest]
+            self.checkpoint.update(queue_name_for(done), fullname_for(done), done.created_utc)
+
+
+async def run_async_producer(fetcher, publisher: AsyncRabbitMQPublisher, rate_controller: AdaptiveRateController,
+                             checkpoint: Checkpoint, seen: SeenFilter, wire_format: str,
+                             queue_size: int = 1000, throttle: bool = True,
+                             compress_threshold: int | None = None) -> None:
+    """Fetch and publish concurrently through a bounded queue.
+
+    ``publisher.max_in_flight`` publisher tasks each take one post at a time
+    off the queue and wait for its confirm, so at most that many posts are
+    unconfirmed and a full queue blocks the fetchers. A post that is nacked
+    or fails to publish is spilled to disk (or retried without a spill log)
+    and the checkpoint never moves past it until it is durable. While the
+    broker is down, including at startup, or the spill log still holds a
+    backlog, new posts are spilled behind it and a replay task drains it. On
+    SIGTERM/SIGINT fetching stops, everything already queued is published or
+    spilled, and the checkpoint is saved.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await publisher.connect()
+    except (aio_pika.exceptions.AMQPConnectionError, ConnectionError, OSError):
+        if publisher.spill is None:
+            raise
+        logging.warning("broker unavailable at startup, spilling to disk until it is back")
+
+    window = ConfirmWindow(checkpoint)
+
+    async def publish_one(item: RedditPost | RedditComment) -> None:
+        """Publish until the post is durable: acked by the broker, or written to the spill log."""
+        body = wire.encode(asdict(item), content_type=wire_format, compress_threshold=compress_threshold,
+                           kind=wire_kind(item))
+        message_id = message_id_for(item)
+        if publisher.must_spill():
+            # queue up behind the backlog so replay keeps delivery order
+            publisher.spill.append([(queue_name_for(item), body, message_id, wire_format)])
+            return
+        while True:
+            try:
+                if await publisher.publish(queue_name_for(item), body, message_id, wire_format):
+                    return
+                failure = "nacked"
+            except Exception as e:
+                failure = repr(e)
+            if publisher.spill is not None:
+                logging.warning(f"publishing {message_id} failed ({failure}), spilling it")
+                publisher.spill.append([(queue_name_for(item), body, message_id, wire_format)])
+                return
+            logging.warning(f"publishing {message_id} failed ({failure}), retrying")
+            await asyncio.sleep(publisher.reconnect_interval)
+
+    async def publish_worker() -> None:
+        while True:
+            item = await queue.get()
+            # taken in queue order, before any await, so the window sees posts in fetch order
+            token = window.start(item)
+            try:
+                if throttle:
+                    await rate_controller.acquire_async()
+                await publish_one(item)
+                window.finish(token, item)
+                seen.add(message_id_for(item))
+            except Exception:
+                # never durable, so this queue's checkpoint stays before it
+                logging.exception(f"publishing {message_id_for(item)} failed")
+            finally:
+                queue.task_done()
+
+    async def replay_spill() -> None:
+        """Reconnect when the broker is down and drain the spill log, oldest first."""
+        while True:
+            if await publisher.ensure_connected():
+                await publisher.replay()
+            await asyncio.sleep(1.0 if publisher.spill is None or publisher.spill.empty() else 0.1)
+
+    workers = [asyncio.create_task(publish_worker()) for _ in range(publisher.max_in_flight)]
+    replay_task = asyncio.create_task(replay_spill())
+    fetch_task = asyncio.create_task(fetcher.produce(queue))
+    stop_task = asyncio.create_task(stop.wait())
+
+    try:
+        while not (stop_task.done() or fetch_task.done()):
+            await asyncio.wait({stop_task, fetch_task}, timeout=1.0, return_when=asyncio.FIRST_COMPLETED)
+            checkpoint.maybe_save()
+            seen.maybe_save()
+            if rate_controller.adjust_due():
+                rate_controller.adjust(
+                    reddit_limits=fetcher.reddit.auth.limits if fetcher.reddit else None,
+                    queue_depth=await publisher.queue_depth(),
+                    confirm_latency=publisher.last_confirm_latency,
+                )
+
+        # stopping, or the fetchers died: publish whatever is queued
+        fetch_task.cancel()
+        fetch_error = (await asyncio.gather(fetch_task, return_exceptions=True))[0]
+        logging.info(f"draining {queue.qsize()} queued posts")
+        await queue.join()
+        if isinstance(fetch_error, Exception):
+            raise fetch_error
+    finally:
+        stop_task.cancel()
+        replay_task.cancel()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(replay_task, *workers, return_exceptions=True)
+        await publisher.close()
+        checkpoint.save()
+        seen.save()
+
+
+def parse_time(value: str) -> float:
+    """ISO 8601 date/time to a unix timestamp; naive values are taken as UTC."""
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+def record_result(result: PublishResult, pending: dict[str, RedditPost | RedditComment],
+                  checkpoint: Checkpoint, seen: SeenFilter) -> None:
+    """Advance the checkpoint and seen filter with posts that are durable (confirmed or spilled)."""
+    for message_id in result.confirmed + result.spilled:
+        item = pending.pop(message_id, None)
+        if item is not None:
+            checkpoint.update(queue_name_for(item), fullname_for(item), item.created_utc)
+            seen.add(message_id)
+    for post_id in result.nacked:
+        pending.pop(post_id, None)
+    if result.nacked:
+        logging.error(f"broker nacked {len(result.nacked)} posts: {result.nacked}")
+    checkpoint.maybe_save()
+    seen.maybe_save()
+
+
 if __name__ == '__main__':
     load_dotenv()
     reddit_client_id: str = os.getenv('REDDIT_CLIENT_ID')
     reddit_client_secret: str = os.getenv('REDDIT_CLIENT_SECRET')
     reddit_user_agent: str = os.getenv('REDDIT_USER_AGENT')
-    subreddit: str = os.getenv('SUB_REDDIT')
+    # comma separated, e.g. SUB_REDDIT=python,datascience
+    subreddits: list[str] = [name.strip() for name in os.getenv('SUB_REDDIT', '').split(',') if name.strip()]
+    multireddit: str | None = os.getenv('MULTIREDDIT')
 
     rabbitmq_user: str = os.getenv('RABBITMQ_USER')
     rabbitmq_password: str = os.getenv('RABBITMQ_PASSWORD')
     rabbitmq_host: str = os.getenv('RABBITMQ_HOST')
     rabbitmq_port: int = int(os.getenv('RABBITMQ_PORT'))
-    simulation_mode: bool = os.getenv('SIMULATION_MODE')
+    simulation_mode: bool = os.getenv('SIMULATION_MODE', 'false').strip().lower() in ('1', 'true', 'yes')
+    include_comments: bool = os.getenv('INGEST_COMMENTS', 'false').strip().lower() in ('1', 'true', 'yes')
+    # sync | async | backfill
+    producer_mode: str = os.getenv('PRODUCER_MODE', 'sync')
+
+    state_dir: str = os.getenv('STATE_DIR', 'state')
+    os.makedirs(state_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(state_dir, 'checkpoint.json'))
+    seen = SeenFilter(
+        os.path.join(state_dir, 'seen.bloom'),
+        capacity=int(os.getenv('SEEN_FILTER_CAPACITY', '500000')),
+    )
 
-    if simulation_mode==True:
+    if simulation_mode:
+        burst_spec = os.getenv('LOADGEN_BURST_PROFILE')
+        vocabulary_file = os.getenv('LOADGEN_VOCABULARY_FILE')
+        vocabulary = None
+        if vocabulary_file:
+            with open(vocabulary_file) as f:
+                vocabulary = f.read().split()
         reddit_fetcher = MockRedditFetcher(
             reddit_client_id, 
             reddit_client_secret, 
             reddit_user_agent,
-            subreddit,
+            subreddits or ['mock'],
+            target_rate=float(os.getenv('LOADGEN_RATE', '0.5')),
+            seed=int(os.getenv('LOADGEN_SEED', '0')),
+            vocabulary=vocabulary,
+            title_length=TextLength(float(os.getenv('LOADGEN_TITLE_WORDS', '8')), 0.5, 50),
+            selftext_length=TextLength(float(os.getenv('LOADGEN_SELFTEXT_WORDS', '60')),
+                                       float(os.getenv('LOADGEN_SELFTEXT_SIGMA', '1.0'))),
+            duplicate_ratio=float(os.getenv('LOADGEN_DUPLICATE_RATIO', '0')),
+            empty_selftext_ratio=float(os.getenv('LOADGEN_EMPTY_SELFTEXT_RATIO', '0')),
+            burst_profile=BurstProfile.parse(burst_spec) if burst_spec else None,
+            comments_per_post=float(os.getenv('LOADGEN_COMMENTS_PER_POST', '0')) if include_comments else 0.0,
             )
-    else:
+    elif producer_mode == 'backfill':
+        reddit_fetcher = BackfillFetcher(
+            reddit_client_id,
+            reddit_client_secret,
+            reddit_user_agent,
+            subreddits,
+            start=parse_time(os.getenv('BACKFILL_START')),
+            end=parse_time(os.getenv('BACKFILL_END')) if os.getenv('BACKFILL_END') else time.time(),
+            listings=[spec.strip() for spec in os.getenv('BACKFILL_LISTINGS', '').split(',') if spec.strip()] or None,
+            workers=int(os.getenv('BACKFILL_WORKERS', '4')),
+            requests_per_minute=float(os.getenv('REDDIT_REQUESTS_PER_MINUTE', '60')),
+            seen=seen,
+            )
+    elif producer_mode == 'async':
+        reddit_fetcher = AsyncRedditFetcher(
+            reddit_client_id,
+            reddit_client_secret,
+            reddit_user_agent,
+            subreddits=subreddits,
+            multireddit=multireddit,
+            group_size=int(os.getenv('SUBREDDIT_GROUP_SIZE', '25')),
+            requests_per_minute=float(os.getenv('REDDIT_REQUESTS_PER_MINUTE', '60')),
+            checkpoint=checkpoint,
+            seen=seen,
+            include_comments=include_comments,
+            )
+    elif len(subreddits) == 1 and not multireddit and not include_comments:
         reddit_fetcher = RedditFetcher(
             reddit_client_id, 
             reddit_client_secret, 
             reddit_user_agent,
-            subreddit,
+            subreddits[0],
+            checkpoint=checkpoint,
+            seen=seen,
+            requests_per_minute=float(os.getenv('REDDIT_REQUESTS_PER_MINUTE', '60')),
+            )
+    else:
+        reddit_fetcher = MultiRedditFetcher(
+            reddit_client_id,
+            reddit_client_secret,
+            reddit_user_agent,
+            subreddits=subreddits,
+            multireddit=multireddit,
+            group_size=int(os.getenv('SUBREDDIT_GROUP_SIZE', '25')),
+            quantum=int(os.getenv('FETCH_QUANTUM', '10')),
+            requests_per_minute=float(os.getenv('REDDIT_REQUESTS_PER_MINUTE', '60')),
+            checkpoint=checkpoint,
+            seen=seen,
+            include_comments=include_comments,
             )
 
-    
-    rabbitmq_publisher = RabbitMQPublisher(
-        rabbitmq_user, rabbitmq_password, rabbitmq_port, rabbitmq_host
+    rate_controller = AdaptiveRateController(
+        initial_rate=float(os.getenv('PUBLISH_RATE_INITIAL', '5')),
+        min_rate=float(os.getenv('PUBLISH_RATE_MIN', '0.5')),
+        max_rate=float(os.getenv('PUBLISH_RATE_MAX', '500')),
+        max_queue_depth=int(os.getenv('MAX_QUEUE_DEPTH', '10000')),
+        target_confirm_latency=float(os.getenv('TARGET_CONFIRM_LATENCY', '0.5')),
     )
+    reddit_client = getattr(reddit_fetcher, 'reddit', None)
+    start_http_server(int(os.getenv('METRICS_PORT', '8002')))
+
+    # roll consumers out first: they decode both formats, old ones only JSON
+    wire_format: str = {
+        'json': wire.CONTENT_TYPE_JSON,
+        'msgpack': wire.CONTENT_TYPE_MSGPACK,
+    }[os.getenv('WIRE_FORMAT', 'json')]
+    # msgpack only: zstd-compress messages of at least this many bytes; unset leaves them uncompressed
+    compress_threshold: int | None = int(os.getenv('WIRE_COMPRESS_THRESHOLD') or 0) or None
+
+    if producer_mode == 'async':
+        if simulation_mode:
+            reddit_fetcher = AsyncFetcherAdapter(reddit_fetcher)
+        asyncio.run(run_async_producer(
+            reddit_fetcher,
+            AsyncRabbitMQPublisher(
+                rabbitmq_user, rabbitmq_password, rabbitmq_port, rabbitmq_host,
+                max_in_flight=int(os.getenv('PUBLISH_MAX_IN_FLIGHT', '1000')),
+                spill=SpillBuffer(os.getenv('SPILL_DIR') or os.path.join(state_dir, 'spill')),
+            ),
+            rate_controller, checkpoint, seen, wire_format,
+            queue_size=int(os.getenv('PRODUCER_QUEUE_SIZE', '1000')),
+            throttle=not simulation_mode,
+            compress_threshold=compress_threshold,
+        ))
+    else:
+        rabbitmq_publisher = RabbitMQPublisher(
+            rabbitmq_user, rabbitmq_password, rabbitmq_port, rabbitmq_host,
+            batch_size=int(os.getenv('PUBLISH_BATCH_SIZE', '500')),
+            flush_interval=float(os.getenv('PUBLISH_FLUSH_INTERVAL', '0.05')),
+            spill=SpillBuffer(os.getenv('SPILL_DIR') or os.path.join(state_dir, 'spill')),
+        )
+
+        pending: dict[str, RedditPost | RedditComment] = {}
+        try:
+            for item in reddit_fetcher.fetch_data():
+                if item is None:
+                    # the fetcher has nothing more for now: publish what is buffered rather than
+                    # holding it until the next post, which can be minutes away
+                    if rabbitmq_publisher.buffered():
+                        record_result(rabbitmq_publisher.flush(), pending, checkpoint, seen)
+                    continue
+                # the load generator paces itself; the controller only throttles real Reddit traffic
+                if not simulation_mode:
+                    rate_controller.acquire()
+                message_id = message_id_for(item)
+                message = wire.encode(asdict(item), content_type=wire_format,
+                                      compress_threshold=compress_threshold, kind=wire_kind(item))
+                pending[message_id] = item
+                result = rabbitmq_publisher.enqueue(queue_name_for(item), message, message_id=message_id,
+                                                    content_type=wire_format)
+                if result:
+                    record_result(result, pending, checkpoint, seen)
+                logging.info(f"queued {message_id} to {queue_name_for(item)}")
 
-    for post in reddit_fetcher.fetch_data():
-        rabbitmq_publisher.publish(subreddit, json.dumps(asdict(post)))
-        logging.info(json.dumps(asdict(post)))
-        time.sleep(2)
+                if rate_controller.adjust_due():
+                    rate_controller.adjust(
+                        reddit_limits=reddit_client.auth.limits if reddit_client else None,
+                        queue_depth=rabbitmq_publisher.queue_depth(),
+                        confirm_latency=rabbitmq_publisher.last_confirm_latency,
+                    )
+        finally:
+            record_result(rabbitmq_publisher.flush(), pending, checkpoint, seen)
+            checkpoint.save()
+            seen.save()
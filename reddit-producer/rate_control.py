@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import threading
+import time
+
+from prometheus_client import Gauge
+
+PUBLISH_RATE = Gauge("producer_publish_rate", "Current target publish rate in posts per second")
+RATE_ADJUSTMENTS = Gauge("producer_rate_last_adjustment", "Last rate adjustment: 1 increase, 0 hold, -1 decrease")
+
+
+class TokenBucket:
+    """Classic token bucket; ``acquire`` blocks until a token is available."""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._last = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def set_rate(self, rate: float) -> None:
+        self._refill()
+        self.rate = rate
+
+    def _take(self, tokens: float) -> float:
+        """Take ``tokens`` if available and return 0, else return seconds to wait."""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while (wait := self._take(tokens)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0) -> None:
+        while (wait := self._take(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+
+class RequestBudget:
+    """Spaces Reddit listing requests to ``requests_per_minute``, shared across threads."""
+    def __init__(self, requests_per_minute: float):
+        self.min_interval = 60.0 / requests_per_minute
+        self._lock = threading.Lock()
+        self._last: float = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            wait = self._last + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last = time.monotonic()
+
+
+class AdaptiveRateController:
+    """Token bucket whose rate follows Reddit's rate-limit state and broker backpressure.
+
+    Every ``adjust_interval`` seconds the rate is cut by ``decrease_factor`` if
+    Reddit's remaining request budget is nearly spent, the deepest queue is past
+    ``max_queue_depth`` or confirms take longer than ``target_confirm_latency``;
+    otherwise it grows by ``increase_step`` (AIMD).
+    """
+    def __init__(self, initial_rate: float = 5.0, min_rate: float = 0.5, max_rate: float = 500.0,
+                 burst: float = 50.0, adjust_interval: float = 5.0,
+                 increase_step: float = 1.0, decrease_factor: float = 0.5,
+                 max_queue_depth: int = 10_000, target_confirm_latency: float = 0.5,
+                 min_reddit_remaining: float = 10.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.adjust_interval = adjust_interval
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.max_queue_depth = max_queue_depth
+        self.target_confirm_latency = target_confirm_latency
+        self.min_reddit_remaining = min_reddit_remaining
+
+        self.bucket = TokenBucket(rate=initial_rate, capacity=burst)
+        self._last_adjust = time.monotonic()
+        PUBLISH_RATE.set(initial_rate)
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def acquire(self) -> None:
+        self.bucket.acquire()
+
+    async def acquire_async(self) -> None:
+        await self.bucket.acquire_async()
+
+    def adjust_due(self) -> bool:
+        return time.monotonic() - self._last_adjust >= self.adjust_interval
+
+    def adjust(self, reddit_limits: dict | None = None, queue_depth: int | None = None,
+               confirm_latency: float | None = None) -> float:
+        """Apply one AIMD step from the latest signals and return the new rate.
+
+        ``reddit_limits`` is praw's ``reddit.auth.limits`` dict; any signal may be
+        None when it is not available (e.g. in simulation mode).
+        """
+        self._last_adjust = time.monotonic()
+        reasons = []
+
+        remaining = (reddit_limits or {}).get('remaining')
+        if remaining is not None and remaining < self.min_reddit_remaining:
+            reasons.append(f"reddit remaining={remaining:.0f}")
+        if queue_depth is not None and queue_depth > self.max_queue_depth:
+            reasons.append(f"queue depth={queue_depth}")
+        if confirm_latency is not None and confirm_latency > self.target_confirm_latency:
+            reasons.append(f"confirm latency={confirm_latency:.3f}s")
+
+        old_rate = self.rate
+        if reasons:
+            new_rate = max(self.min_rate, old_rate * self.decrease_factor)
+            RATE_ADJUSTMENTS.set(-1)
+        else:
+            new_rate = min(self.max_rate, old_rate + self.increase_step)
+            RATE_ADJUSTMENTS.set(1 if new_rate > old_rate else 0)
+
+        if new_rate != old_rate:
+            self.bucket.set_rate(new_rate)
+            PUBLISH_RATE.set(new_rate)
+            logging.info(f"publish rate {old_rate:.2f} -> {new_rate:.2f}/s"
+                         + (f" ({', '.join(reasons)})" if reasons else ""))
+        return new_rate
@@ -0,0 +1,145 @@
+import logging
+import os
+import struct
+import zlib
+
+from prometheus_client import Counter, Gauge
+
+SPILL_BUFFERED_BYTES = Gauge("spill_buffered_bytes", "Bytes written to the spill log and not yet replayed")
+SPILL_WRITTEN = Counter("spill_written_messages_total", "Messages written to the spill log")
+SPILL_REPLAYED = Counter("spill_replayed_messages_total", "Messages replayed from the spill log")
+SPILL_REPLAY_RATE = Gauge("spill_replay_rate", "Messages per second replayed by the last replay batch")
+
+
+class SpillBuffer:
+    """Append-only, segmented on-disk log of messages that could not be published.
+
+    Each record is ``crc32 | body length | queue length | id length | content
+    type length`` followed by those four fields. Records are replayed in write
+    order from a persisted cursor; a segment file is deleted once the cursor
+    has moved past it. A torn record at the end of a segment (crash mid-write)
+    fails its crc and is skipped.
+    """
+    HEADER = struct.Struct('<IIHHH')
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.cursor_path = os.path.join(directory, 'cursor')
+        self.read_segment, self.read_offset = self._load_cursor()
+        segments = self._segments()
+        # never append to a segment from a previous run: its tail may be torn
+        self.write_segment = max(segments[-1] + 1 if segments else 0, self.read_segment)
+        self.buffered_bytes = sum(os.path.getsize(self._path(seg)) for seg in segments) - self.read_offset
+        SPILL_BUFFERED_BYTES.set(self.buffered_bytes)
+        if self.buffered_bytes:
+            logging.info(f"spill log holds {self.buffered_bytes} bytes awaiting replay")
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}.log")
+
+    def _segments(self) -> list[int]:
+        return sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith('.log'))
+
+    def _load_cursor(self) -> tuple[int, int]:
+        if os.path.exists(self.cursor_path):
+            with open(self.cursor_path) as f:
+                segment, offset = f.read().split()
+            return int(segment), int(offset)
+        return 0, 0
+
+    def _save_cursor(self) -> None:
+        tmp_path = f"{self.cursor_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(f"{self.read_segment} {self.read_offset}")
+        os.replace(tmp_path, self.cursor_path)
+
+    def empty(self) -> bool:
+        return self.buffered_bytes <= 0
+
+    def append(self, messages: list[tuple[str, bytes, str, str]]) -> None:
+        """Durably append ``(queue_name, body, message_id, content_type)`` records."""
+        if not messages:
+            return
+        if os.path.exists(self._path(self.write_segment)) and \
+                os.path.getsize(self._path(self.write_segment)) >= self.segment_bytes:
+            self.write_segment += 1
+        chunks = []
+        for queue_name, body, message_id, content_type in messages:
+            fields = (body, queue_name.encode(), message_id.encode(), content_type.encode())
+            payload = b''.join(fields)
+            chunks.append(self.HEADER.pack(zlib.crc32(payload), *(len(field) for field in fields)) + payload)
+        data = b''.join(chunks)
+        with open(self._path(self.write_segment), 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.buffered_bytes += len(data)
+        SPILL_BUFFERED_BYTES.set(self.buffered_bytes)
+        SPILL_WRITTEN.inc(len(messages))
+
+    def read(self, max_messages: int) -> tuple[list[tuple[str, bytes, str, str]], tuple[int, int]]:
+        """Up to ``max_messages`` records from the cursor, and the position after them.
+
+        Nothing is consumed until ``commit`` is called with that position.
+        """
+        records = []
+        segment, offset = self.read_segment, self.read_offset
+        while len(records) < max_messages and segment <= self.write_segment:
+            path = self._path(segment)
+            if not os.path.exists(path):
+                if segment >= self.write_segment:
+                    break
+                segment, offset = segment + 1, 0
+                continue
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                while len(records) < max_messages:
+                    header = f.read(self.HEADER.size)
+                    if len(header) < self.HEADER.size:
+                        break
+                    crc, *lengths = self.HEADER.unpack(header)
+                    payload = f.read(sum(lengths))
+                    if len(payload) < sum(lengths) or zlib.crc32(payload) != crc:
+                        logging.warning(f"skipping torn record at {path}:{offset}")
+                        offset = os.path.getsize(path)
+                        break
+                    body_len, queue_len, id_len, _ = lengths
+                    body = payload[:body_len]
+                    queue_name = payload[body_len:body_len + queue_len].decode()
+                    message_id = payload[body_len + queue_len:body_len + queue_len + id_len].decode()
+                    content_type = payload[body_len + queue_len + id_len:].decode()
+                    records.append((queue_name, body, message_id, content_type))
+                    offset += self.HEADER.size + len(payload)
+            if len(records) < max_messages and segment < self.write_segment:
+                segment, offset = segment + 1, 0
+            else:
+                break
+        return records, (segment, offset)
+
+    def commit(self, position: tuple[int, int], replayed: int, elapsed: float) -> None:
+        """Move the cursor to ``position`` and drop fully replayed segments."""
+        segment, offset = position
+        consumed = 0
+        for seg in range(self.read_segment, segment):
+            path = self._path(seg)
+            if os.path.exists(path):
+                consumed += os.path.getsize(path) - (self.read_offset if seg == self.read_segment else 0)
+                os.remove(path)
+        consumed += offset - (self.read_offset if segment == self.read_segment else 0)
+        self.read_segment, self.read_offset = segment, offset
+        if segment == self.write_segment and os.path.exists(self._path(segment)) \
+                and offset >= os.path.getsize(self._path(segment)):
+            # fully drained: start a fresh segment instead of growing this one forever
+            os.remove(self._path(segment))
+            self.read_segment = self.write_segment = segment + 1
+            self.read_offset = 0
+        self._save_cursor()
+
+        self.buffered_bytes = max(0, self.buffered_bytes - consumed)
+        SPILL_BUFFERED_BYTES.set(self.buffered_bytes)
+        SPILL_REPLAYED.inc(replayed)
+        if elapsed > 0:
+            SPILL_REPLAY_RATE.set(replayed / elapsed)
+
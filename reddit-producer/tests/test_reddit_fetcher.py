@@ -0,0 +1,36 @@
+import time
+
+import main
+
+
+class IdleStream:
+    """Stands in for praw's stream: every poll comes back empty."""
+    def __init__(self):
+        self.polls = 0
+
+    def submissions(self, skip_existing: bool, pause_after: int):
+        while True:
+            self.polls += 1
+            yield None
+
+
+class FakeReddit:
+    def __init__(self, **_credentials):
+        self.stream = IdleStream()
+
+    def subreddit(self, _name):
+        return self
+
+
+def test_idle_stream_polls_within_request_budget(monkeypatch):
+    monkeypatch.setattr(main.praw, "Reddit", FakeReddit)
+    fetcher = main.RedditFetcher("id", "secret", "agent", "python", requests_per_minute=600)
+    posts = fetcher.fetch_data()
+
+    started = time.monotonic()
+    while time.monotonic() - started < 0.5:
+        assert next(posts) is None
+    elapsed = time.monotonic() - started
+
+    # 600/min is one poll per 0.1s; allow the first, unspaced one
+    assert fetcher.reddit.stream.polls <= elapsed / 0.1 + 2